@@ -2,8 +2,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
 import os
+from jose import jwt, JWTError
 from typing import List, Dict, Any
 
+from admin_token import AdminTokenAuth, AdminTokenManager
+from http_client import get_client
+from jwks_cache import JWKSKeyStore
+from token_cache import VerifiedClaimsCache
+
 router = APIRouter(prefix="/admin", tags=["admin"])
 security = HTTPBearer()
 
@@ -13,75 +19,59 @@ REALM = os.getenv("KEYCLOAK_REALM", "myrealm")
 CLIENT_ID = os.getenv("KEYCLOAK_CLIENT_ID", "myclient")
 CLIENT_SECRET = os.getenv("KEYCLOAK_CLIENT_SECRET", "your-client-secret")
 
-async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verify the JWT token and check if user has admin role"""
-    token = credentials.credentials
-    
-    try:
-        # Verify token with Keycloak introspection endpoint
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_URL}/realms/{REALM}/protocol/openid-connect/token/introspect",
-                data={
-                    "token": token,
-                    "client_id": CLIENT_ID,
-                    "client_secret": CLIENT_SECRET
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            
-            token_data = response.json()
-            
-            if not token_data.get("active"):
-                raise HTTPException(status_code=401, detail="Token is not active")
-            
-            # Check if user has admin role
-            realm_access = token_data.get("realm_access", {})
-            roles = realm_access.get("roles", [])
-            
-            if "admin" not in roles:
-                raise HTTPException(
-                    status_code=403, 
-                    detail="Access denied. Admin role required."
-                )
-            
-            return token_data
-            
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Error verifying token: {str(e)}")
+jwks_store = JWKSKeyStore(f"{KEYCLOAK_URL}/realms/{REALM}/protocol/openid-connect/certs")
+claims_cache = VerifiedClaimsCache(max_size=int(os.getenv("CLAIMS_CACHE_SIZE", "10000")))
+jwks_store.add_rotation_listener(claims_cache.invalidate_kids)
+
 
+async def verify_token_locally(token: str) -> Dict[str, Any]:
+    """Verify the JWT signature and expiry against the realm's signing keys"""
+    cached_claims = claims_cache.get(token)
+    if cached_claims is not None:
+        return cached_claims
 
-async def get_admin_token():
-    """Get an admin access token from Keycloak"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_URL}/realms/{REALM}/protocol/openid-connect/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": CLIENT_ID,
-                    "client_secret": CLIENT_SECRET
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="Failed to get admin token"
-                )
-            
-            return response.json()["access_token"]
-            
-    except httpx.RequestError as e:
+        kid = jwt.get_unverified_header(token).get("kid")
+        public_key = await jwks_store.get_key(kid) if kid else None
+        if public_key is None:
+            raise JWTError("Unknown signing key")
+        # Introspection never checked the audience either, so keep parity here
+        claims = jwt.decode(token, public_key, algorithms=["RS256"], options={"verify_aud": False})
+    except JWTError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+
+    claims_cache.put(token, claims, kid)
+    return claims
+
+
+async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verify the bearer token locally and require the admin role"""
+    token_data = await verify_token_locally(credentials.credentials)
+
+    # Check if user has admin role
+    realm_access = token_data.get("realm_access", {})
+    roles = realm_access.get("roles", [])
+
+    if "admin" not in roles:
         raise HTTPException(
-            status_code=500, 
-            detail=f"Error getting admin token: {str(e)}"
+            status_code=403,
+            detail="Access denied. Admin role required."
         )
 
+    return token_data
+
+
+# Service-account token for the Admin API, shared across requests and refreshed ahead of expiry
+admin_tokens = AdminTokenManager(
+    f"{KEYCLOAK_URL}/realms/{REALM}/protocol/openid-connect/token",
+    {
+        "grant_type": "client_credentials",
+        "client_id": CLIENT_ID,
+        "client_secret": CLIENT_SECRET
+    },
+)
+admin_auth = AdminTokenAuth(admin_tokens)
+
 
 @router.get("/users")
 async def get_users(token_data: dict = Depends(verify_admin_token)) -> List[Dict[str, Any]]:
@@ -89,47 +79,42 @@ async def get_users(token_data: dict = Depends(verify_admin_token)) -> List[Dict
     Get all users from Keycloak (Admin only)
     """
     try:
-        # Get admin token to query Keycloak Admin API
-        admin_token = await get_admin_token()
+        client = get_client()
+        # Fetch users from Keycloak Admin API
+        response = await client.get(
+            f"{KEYCLOAK_URL}/admin/realms/{REALM}/users",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth
+        )
         
-        async with httpx.AsyncClient() as client:
-            # Fetch users from Keycloak Admin API
-            response = await client.get(
-                f"{KEYCLOAK_URL}/admin/realms/{REALM}/users",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                }
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch users from Keycloak: {response.text}"
             )
+        
+        users = response.json()
+        
+        # Format user data for frontend
+        formatted_users = []
+        for user in users:
+            # Fetch roles for each user
+            user_roles = await get_user_roles(user["id"])
             
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fetch users from Keycloak: {response.text}"
-                )
-            
-            users = response.json()
-            
-            # Format user data for frontend
-            formatted_users = []
-            for user in users:
-                # Fetch roles for each user
-                user_roles = await get_user_roles(admin_token, user["id"])
-                
-                formatted_users.append({
-                    "id": user.get("id"),
-                    "username": user.get("username"),
-                    "email": user.get("email"),
-                    "firstName": user.get("firstName"),
-                    "lastName": user.get("lastName"),
-                    "enabled": user.get("enabled", False),
-                    "emailVerified": user.get("emailVerified", False),
-                    "createdTimestamp": user.get("createdTimestamp"),
-                    "roles": user_roles
-                })
-            
-            return formatted_users
-            
+            formatted_users.append({
+                "id": user.get("id"),
+                "username": user.get("username"),
+                "email": user.get("email"),
+                "firstName": user.get("firstName"),
+                "lastName": user.get("lastName"),
+                "enabled": user.get("enabled", False),
+                "emailVerified": user.get("emailVerified", False),
+                "createdTimestamp": user.get("createdTimestamp"),
+                "roles": user_roles
+            })
+        
+        return formatted_users
+        
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=500,
@@ -137,24 +122,22 @@ async def get_users(token_data: dict = Depends(verify_admin_token)) -> List[Dict
         )
 
 
-async def get_user_roles(admin_token: str, user_id: str) -> List[str]:
+async def get_user_roles(user_id: str) -> List[str]:
     """Get realm roles for a specific user"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{KEYCLOAK_URL}/admin/realms/{REALM}/users/{user_id}/role-mappings/realm",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                }
-            )
+        client = get_client()
+        response = await client.get(
+            f"{KEYCLOAK_URL}/admin/realms/{REALM}/users/{user_id}/role-mappings/realm",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth
+        )
+        
+        if response.status_code == 200:
+            roles_data = response.json()
+            return [role["name"] for role in roles_data]
+        else:
+            return []
             
-            if response.status_code == 200:
-                roles_data = response.json()
-                return [role["name"] for role in roles_data]
-            else:
-                return []
-                
     except httpx.RequestError:
         return []
 
@@ -166,41 +149,37 @@ async def get_user(
 ) -> Dict[str, Any]:
     """Get a specific user by ID (Admin only)"""
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        response = await client.get(
+            f"{KEYCLOAK_URL}/admin/realms/{REALM}/users/{user_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{KEYCLOAK_URL}/admin/realms/{REALM}/users/{user_id}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                }
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="Failed to fetch user"
             )
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="Failed to fetch user"
-                )
-            
-            user = response.json()
-            user_roles = await get_user_roles(admin_token, user["id"])
-            
-            return {
-                "id": user.get("id"),
-                "username": user.get("username"),
-                "email": user.get("email"),
-                "firstName": user.get("firstName"),
-                "lastName": user.get("lastName"),
-                "enabled": user.get("enabled", False),
-                "emailVerified": user.get("emailVerified", False),
-                "createdTimestamp": user.get("createdTimestamp"),
-                "roles": user_roles
-            }
-            
+        
+        user = response.json()
+        user_roles = await get_user_roles(user["id"])
+        
+        return {
+            "id": user.get("id"),
+            "username": user.get("username"),
+            "email": user.get("email"),
+            "firstName": user.get("firstName"),
+            "lastName": user.get("lastName"),
+            "enabled": user.get("enabled", False),
+            "emailVerified": user.get("emailVerified", False),
+            "createdTimestamp": user.get("createdTimestamp"),
+            "roles": user_roles
+        }
+        
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from http_client import get_client
+
+
+class AdminTokenManager:
+    """
+    Caches the admin access token used for Keycloak Admin API calls.
+
+    The token is reused until `expiry_margin` seconds before it expires. Once it
+    is within `refresh_ahead` seconds of expiry, callers still get the cached
+    token while a replacement is fetched in the background. Concurrent callers
+    that need a fresh token all wait on the same in-flight fetch.
+
+    After a failed fetch, background refreshes wait `retry_backoff` seconds
+    (doubling per consecutive failure, up to `max_retry_backoff`) before trying
+    again, while the still-valid cached token keeps being served.
+    """
+
+    def __init__(
+        self,
+        token_url: str,
+        form_data: Dict[str, str],
+        refresh_ahead: float = 30.0,
+        expiry_margin: float = 5.0,
+        retry_backoff: float = 2.0,
+        max_retry_backoff: float = 60.0,
+    ):
+        self.token_url = token_url
+        self.form_data = form_data
+        self.refresh_ahead = refresh_ahead
+        self.expiry_margin = expiry_margin
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+        # Consecutive failed fetches, and the monotonic time before which no background refresh starts
+        self.consecutive_failures = 0
+        self._retry_at = 0.0
+
+        self.hits = 0
+        self.fetches = 0
+        self.background_refreshes = 0
+        self.invalidations = 0
+        self.fetch_errors = 0
+
+    async def _fetch(self) -> str:
+        try:
+            token = await self._request_token()
+        except Exception:
+            self.consecutive_failures += 1
+            backoff = self.retry_backoff * 2 ** (self.consecutive_failures - 1)
+            self._retry_at = time.monotonic() + min(backoff, self.max_retry_backoff)
+            raise
+        self.consecutive_failures = 0
+        self._retry_at = 0.0
+        return token
+
+    async def _request_token(self) -> str:
+        try:
+            response = await get_client().post(
+                self.token_url,
+                data=self.form_data,
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
+        except httpx.RequestError as e:
+            self.fetch_errors += 1
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error getting admin token from Keycloak: {str(e)}"
+            )
+
+        if response.status_code != 200:
+            self.fetch_errors += 1
+            print(f"Failed to get admin token: {response.text}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to authenticate with Keycloak admin. Check credentials. HTTP: {response.status_code}"
+            )
+
+        token_data = response.json()
+        expires_in = float(token_data.get("expires_in", 60))
+        now = time.monotonic()
+
+        self._token = token_data["access_token"]
+        self._expires_at = now + expires_in - self.expiry_margin
+        self._refresh_at = now + max(expires_in - self.refresh_ahead, expires_in / 2)
+        self.fetches += 1
+        return self._token
+
+    def _start_fetch(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+            # Background refreshes may fail with nobody awaiting them; don't let that go unreported
+            self._inflight.add_done_callback(self._report_failure)
+        return self._inflight
+
+    @staticmethod
+    def _report_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Warning: Admin token refresh failed: {task.exception()!r}")
+
+    async def get_token(self) -> str:
+        now = time.monotonic()
+        if self._token is not None and now < self._expires_at:
+            refresh_due = now >= self._refresh_at and now >= self._retry_at
+            if refresh_due and (self._inflight is None or self._inflight.done()):
+                self.background_refreshes += 1
+                self._start_fetch()
+            self.hits += 1
+            return self._token
+
+        # Shield so one cancelled request doesn't cancel the fetch everyone else waits on
+        return await asyncio.shield(self._start_fetch())
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Forget the cached token (only if it is still `token`, when given)."""
+        if token is None or token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": self._token is not None,
+            "seconds_to_expiry": round(max(self._expires_at - time.monotonic(), 0.0), 1),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "background_refreshes": self.background_refreshes,
+            "invalidations": self.invalidations,
+            "fetch_errors": self.fetch_errors,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(max(self._retry_at - time.monotonic(), 0.0), 1),
+        }
+
+
+class AdminTokenAuth(httpx.Auth):
+    """
+    httpx auth that attaches the managed admin token. If Keycloak rejects the
+    token with a 401 (revoked, or the realm keys rotated), the token is dropped
+    and the request is retried once with a freshly fetched one.
+    """
+
+    def __init__(self, manager: AdminTokenManager):
+        self.manager = manager
+
+    def sync_auth_flow(self, request):
+        raise RuntimeError("AdminTokenAuth only supports httpx.AsyncClient")
+
+    async def async_auth_flow(self, request):
+        token = await self.manager.get_token()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+
+        if response.status_code == 401:
+            self.manager.invalidate(token)
+            token = await self.manager.get_token()
+            request.headers["Authorization"] = f"Bearer {token}"
+            yield request
@@ -0,0 +1,126 @@
+"""
+Benchmark for running SQLAlchemy work through db_executor instead of on the
+event loop. Every SQL statement is slowed down by a fixed delay, and a ticker
+coroutine measures how late the event loop wakes it up (loop lag) while
+concurrent DB calls run:
+
+  - "inline": the query function called directly in the coroutine, as the
+    endpoints did before
+  - "executor": the same function through db_executor.run_session
+
+It also checks that the executor never has more DB calls running, or more
+connections checked out, than the engine pool allows (pool_size +
+max_overflow), so no worker ever waits on the pool.
+
+    cd backend && python bench/db_event_loop.py --calls 10 40 --delay 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_db_loop.db')}")
+
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402
+
+TICK = 0.01
+
+
+class Peaks:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak_running = 0
+        self.peak_checked_out = 0
+
+    def enter(self):
+        with self.lock:
+            self.running += 1
+            self.peak_running = max(self.peak_running, self.running)
+
+    def leave(self):
+        with self.lock:
+            self.running -= 1
+
+
+def make_query(peaks: Peaks):
+    def query(db):
+        peaks.enter()
+        try:
+            version = main.get_data_version(db, "role_permissions")
+            peaks.peak_checked_out = max(peaks.peak_checked_out, main.engine.pool.checkedout())
+            return version
+        finally:
+            peaks.leave()
+    return query
+
+
+async def measure(mode: str, calls: int):
+    peaks = Peaks()
+    query = make_query(peaks)
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    async def inline_call():
+        with main.SessionLocal() as db:
+            return query(db)
+
+    async def executor_call():
+        return await main.db_executor.run_session(query)
+
+    call = inline_call if mode == "inline" else executor_call
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    return elapsed, lags, peaks
+
+
+async def run(call_counts, delay):
+    @event.listens_for(main.engine, "before_cursor_execute")
+    def slow_statement(*args):
+        time.sleep(delay)
+
+    pool_limit = main.DB_POOL_SIZE + main.DB_MAX_OVERFLOW
+    print(
+        f"{delay * 1000:.0f} ms per statement; pool_size={main.DB_POOL_SIZE} "
+        f"max_overflow={main.DB_MAX_OVERFLOW} executor workers={main.db_executor.max_workers}"
+    )
+    assert main.db_executor.max_workers == pool_limit, "executor workers must match the connection pool"
+    for calls in call_counts:
+        for mode in ("inline", "executor"):
+            elapsed, lags, peaks = await measure(mode, calls)
+            lag_ms = [lag * 1000 for lag in lags] or [0.0]
+            print(
+                f"calls={calls:<4} {mode:<9} wall={elapsed:6.2f}s  "
+                f"loop lag p50={statistics.median(lag_ms):7.1f}ms max={max(lag_ms):7.1f}ms  "
+                f"peak running={peaks.peak_running} peak connections={peaks.peak_checked_out}"
+            )
+            if mode == "executor":
+                assert peaks.peak_running <= pool_limit, "more DB calls ran than the pool has connections"
+                assert peaks.peak_checked_out <= pool_limit, "connections exceeded pool_size + max_overflow"
+    main.db_executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds added to every SQL statement")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.delay))
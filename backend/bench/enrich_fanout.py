@@ -0,0 +1,84 @@
+"""
+Benchmark for the GET /admin/users enrichment fan-out (map_concurrently +
+enrich_user) against a simulated Keycloak that answers every request after a
+fixed latency. Shows how wall time scales with user count and concurrency
+limit. No Keycloak or database server is needed.
+
+    cd backend && python bench/enrich_fanout.py --users 200 1000 --limits 1 4 16 64 --latency 0.005
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_enrich.db')}")
+os.environ["DIRECTORY_MIRROR_ENABLED"] = "false"
+
+import http_client  # noqa: E402
+import main  # noqa: E402
+
+
+class SimulatedKeycloak:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            path = request.url.path
+            if path.endswith("/token"):
+                return httpx.Response(200, json={"access_token": "bench", "expires_in": 300})
+            if path.endswith("/groups"):
+                return httpx.Response(200, json=[{"id": "g1", "name": "group1"}])
+            if path.endswith("/role-mappings/realm"):
+                return httpx.Response(200, json=[{"id": "r1", "name": "role1"}])
+            return httpx.Response(404)
+        finally:
+            self.in_flight -= 1
+
+
+async def run(user_counts, limits, latency):
+    keycloak = SimulatedKeycloak(latency)
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(keycloak.handle))
+    current_user = {"preferred_username": "bench"}
+    try:
+        print(f"simulated Keycloak latency {latency * 1000:.0f} ms per request")
+        for count in user_counts:
+            users = [
+                {"id": f"u{i}", "username": f"user{i}", "email": f"user{i}@example.com", "enabled": True}
+                for i in range(count)
+            ]
+            for limit in limits:
+                keycloak.peak_in_flight = 0
+                started = time.perf_counter()
+                rows = await main.map_concurrently(
+                    lambda user: main.enrich_user(user, {}, current_user), users, limit=limit
+                )
+                elapsed = time.perf_counter() - started
+                assert [row["id"] for row in rows] == [user["id"] for user in users], "order not preserved"
+                print(
+                    f"users={count:<6} limit={limit:<4} {elapsed:7.2f}s  "
+                    f"peak in-flight requests={keycloak.peak_in_flight}"
+                )
+    finally:
+        await http_client.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per simulated Keycloak request")
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.limits, args.latency))
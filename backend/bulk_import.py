@@ -0,0 +1,157 @@
+import asyncio
+import codecs
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+CSV_MEDIA_TYPES = ("text/csv", "application/csv")
+# Longest line (in characters) an import body may contain; bounds the reader's memory
+MAX_IMPORT_LINE_LENGTH = int(os.getenv("MAX_IMPORT_LINE_LENGTH", "65536"))
+
+
+class LineTooLongError(ValueError):
+    """A request body line longer than MAX_IMPORT_LINE_LENGTH."""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while
+    the response streams. The stock class listens on `receive` for a client
+    disconnect, which would swallow body chunks; here the body reader notices
+    the disconnect itself (request.stream() raises ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_body_lines(request: Request, max_length: int = MAX_IMPORT_LINE_LENGTH) -> AsyncIterator[str]:
+    """
+    Decodes the request body as UTF-8 and yields it line by line, without
+    buffering it whole. Only the unfinished last line is kept between chunks;
+    raises LineTooLongError once it grows past `max_length` characters.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    # Pieces of the current, unfinished line, so each chunk is only scanned once
+    partial: List[str] = []
+    partial_length = 0
+
+    def check(length: int) -> None:
+        if length > max_length:
+            raise LineTooLongError(f"Line longer than {max_length} characters")
+
+    async for chunk in request.stream():
+        text = decoder.decode(chunk)
+        if "\n" not in text:
+            partial.append(text)
+            partial_length += len(text)
+            check(partial_length)
+            continue
+        first, *lines, tail = text.split("\n")
+        check(partial_length + len(first))
+        partial.append(first)
+        yield "".join(partial).rstrip("\r")
+        for line in lines:
+            check(len(line))
+            yield line.rstrip("\r")
+        partial, partial_length = [tail], len(tail)
+        check(partial_length)
+    partial.append(decoder.decode(b"", final=True))
+    last = "".join(partial)
+    check(len(last))
+    if last:
+        yield last.rstrip("\r")
+
+
+async def iter_import_rows(
+    request: Request, fmt: str
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Yields `(row_number, row, error)` for each record of a CSV (first line is the
+    header) or NDJSON body. Blank lines are skipped; unparseable rows come back
+    with `row=None` and the parse error. CSV fields may not contain newlines.
+    A line over MAX_IMPORT_LINE_LENGTH raises LineTooLongError.
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    async for line in iter_body_lines(request):
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            if len(values) > len(header):
+                yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield row_number, {name: value for name, value in zip(header, values) if value != ""}, None
+        else:
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, row, None
+
+
+async def prepend(first: Any, items: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """`first`, then the rest of `items` (to put back an item read ahead)."""
+    yield first
+    async for item in items:
+        yield item
+
+
+async def batched(items: AsyncIterator[Any], size: int) -> AsyncIterator[List[Any]]:
+    batch: List[Any] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_as_completed(
+    func: Callable[[Any], Awaitable[Any]], items: AsyncIterator[Any], limit: int
+) -> AsyncIterator[Any]:
+    """
+    Runs `func(item)` for items pulled from an async iterator, at most `limit`
+    at a time, yielding results in completion order. The next item is only
+    pulled once a slot is free, so a slow upstream throttles the reader. If
+    reading `items` fails, the calls already started are finished and yielded
+    before the error is raised.
+    """
+    pending = set()
+    try:
+        read_error = None
+        try:
+            async for item in items:
+                pending.add(asyncio.ensure_future(func(item)))
+                if len(pending) >= max(limit, 1):
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+        except Exception as e:
+            read_error = e
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+        if read_error is not None:
+            raise read_error
+    finally:
+        for task in pending:
+            task.cancel()
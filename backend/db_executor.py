@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from sqlalchemy.orm import Session
+
+
+class DatabaseExecutor:
+    """
+    Bounded thread pool for blocking SQLAlchemy work, so a slow query holds a
+    DB worker instead of the event loop.
+
+    `run_session(func, *args)` opens a session on a worker thread, calls
+    `func(session, *args)` there and closes it again, so sessions and ORM
+    objects never cross threads; `func` should return plain data. Size the pool
+    to the engine's `pool_size + max_overflow` so workers never queue for a
+    connection; excess calls wait here, without tying up a thread.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_workers: int):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.errors = 0
+        self.peak_queued = 0
+        self._wait_total = 0.0
+        self._lock = threading.Lock()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        submitted = time.monotonic()
+
+        def call():
+            with self._lock:
+                self._wait_total += time.monotonic() - submitted
+                self.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        self.in_flight += 1
+        self.peak_queued = max(self.peak_queued, self.in_flight - self.max_workers)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def run_session(self, func: Callable[..., Any], *args: Any) -> Any:
+        def call():
+            with self.session_factory() as db:
+                return func(db, *args)
+
+        return await self.run(call)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "queued": max(self.in_flight - self.running, 0),
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "errors": self.errors,
+            "avg_queue_wait_ms": round(self._wait_total / self.completed * 1000, 2) if self.completed else 0.0,
+        }
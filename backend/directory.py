@@ -0,0 +1,638 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+import httpx
+
+from http_client import get_client
+
+# Sort keys accepted by the user listing; prefix with "-" for descending
+USER_SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "username": lambda u: (u.get("username") or "").lower(),
+    "createdTimestamp": lambda u: u.get("createdTimestamp") or 0,
+}
+
+
+def user_search_text(user: Dict[str, Any]) -> str:
+    fields = ("username", "email", "firstName", "lastName")
+    return " ".join(user.get(field) or "" for field in fields).lower()
+
+
+def matches_search(text: str, search: str) -> bool:
+    """Every whitespace-separated term must appear somewhere in `text`."""
+    return all(term in text for term in search.lower().split())
+
+
+def sort_users(users: List[Dict[str, Any]], sort: str) -> List[Dict[str, Any]]:
+    key = USER_SORT_KEYS[sort.lstrip("-")]
+    return sorted(users, key=key, reverse=sort.startswith("-"))
+
+
+class UsernameCache:
+    """
+    Bounded LRU of username -> user id lookups answered by Keycloak, shared
+    across requests. Entries expire after `ttl` seconds so a user deleted and
+    re-created outside this backend is picked up again.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[str]:
+        key = username.lower()
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, username: str, user_id: str) -> None:
+        if self.max_size <= 0:
+            return
+        key = username.lower()
+        self._entries[key] = (user_id, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def forget_user(self, user_id: str) -> None:
+        for key in [key for key, (cached_id, _) in self._entries.items() if cached_id == user_id]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class DirectoryMirror:
+    """
+    In-process read-through copy of the realm's users, groups, roles, group
+    memberships and direct realm/client role mappings.
+
+    Reverse indexes (user->groups, group->members, user->roles, role->users) make
+    the admin listings dictionary lookups instead of per-user Keycloak requests.
+    The mirror is loaded with a full sync, kept current by write-through calls
+    from the mutating endpoints, and re-synced in the background once it is
+    older than `max_staleness` seconds.
+
+    A failed sync is retried with exponential backoff (from `retry_backoff` up
+    to `max_retry_backoff` seconds); until one succeeds, `ensure_fresh` reports
+    the mirror unavailable at once so reads go to Keycloak directly. Groups or
+    roles whose members Keycloak refuses to list are kept with no members and
+    reported in `stats()` rather than failing the whole sync.
+
+    Subgroups are mirrored alongside top-level groups (each tagged with its
+    `parentId`), so a user's group list includes subgroup memberships as the
+    live `/users/{id}/groups` does; `list_groups` still returns only the
+    top-level ones, like Keycloak's `/groups`.
+    """
+
+    def __init__(
+        self,
+        admin_realm_url: str,
+        auth: httpx.Auth,
+        realm: str,
+        max_staleness: float = 300.0,
+        concurrency: int = 16,
+        page_size: int = 500,
+        retry_backoff: float = 5.0,
+        max_retry_backoff: float = 300.0,
+    ):
+        self.admin_realm_url = admin_realm_url
+        self.auth = auth
+        self.realm = realm
+        self.max_staleness = max_staleness
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.roles: Dict[str, Dict[str, Any]] = {}
+        self.user_groups: Dict[str, Set[str]] = {}
+        self.group_members: Dict[str, Set[str]] = {}
+        self.user_roles: Dict[str, Set[str]] = {}
+        self.role_users: Dict[str, Set[str]] = {}
+        # Lower-cased username/email/name per user, for search
+        self.search_text: Dict[str, str] = {}
+        # Lower-cased username -> user id
+        self.username_ids: Dict[str, str] = {}
+
+        # Bumped on every change; lets callers cheaply tell whether anything moved
+        self.version = 0
+        # Random per mirror instance, since `version` restarts at 0 and differs between workers
+        self.epoch = uuid.uuid4().hex
+        self.last_sync = 0.0
+        # Wall-clock ms at which the last successful full sync started reading Keycloak
+        self.synced_from_ms = 0
+        self.last_sync_duration = 0.0
+        self.syncs = 0
+        self.sync_errors = 0
+        # Consecutive failed syncs, and the monotonic time before which no new one is started
+        self.consecutive_failures = 0
+        self.next_attempt_at = 0.0
+        # Groups/roles whose members couldn't be listed in the last full sync
+        self.unsynced_groups: Set[str] = set()
+        self.unsynced_roles: Set[str] = set()
+
+        self._sync_task: Optional[asyncio.Task] = None
+        # Write-through changes made while a full sync is running, replayed onto its result
+        self._pending_writes: Optional[List[Callable[[], None]]] = None
+
+    @property
+    def generation(self) -> str:
+        """`version` qualified by this instance's epoch; safe to compare across restarts and workers."""
+        return f"{self.epoch}.{self.version}"
+
+    # --- Full sync ---
+
+    async def fetch_all(self, path: str, **params) -> List[Dict[str, Any]]:
+        client = get_client()
+        items: List[Dict[str, Any]] = []
+        while True:
+            response = await client.get(
+                f"{self.admin_realm_url}{path}",
+                params={**params, "first": len(items), "max": self.page_size},
+                auth=self.auth
+            )
+            response.raise_for_status()
+            page = response.json()
+            items.extend(page)
+            if len(page) < self.page_size:
+                return items
+
+    async def gather_limited(self, coros: Iterable) -> List[Any]:
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+
+        async def run(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*(run(coro) for coro in coros))
+
+    def _role_users_path(self, role: Dict[str, Any]) -> str:
+        role_name = quote(role["name"], safe="")
+        if role.get("clientRole"):
+            return f"/clients/{role['containerId']}/roles/{role_name}/users"
+        return f"/roles/{role_name}/users"
+
+    async def _fetch_group_tree(self, top_level: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        `top_level` and all their subgroups, flattened with parents before children.
+        Uses each group's embedded `subGroups`, and asks `/groups/{id}/children`
+        when Keycloak (23+) reports more subgroups (`subGroupCount`) than it embedded.
+        """
+        groups: List[Dict[str, Any]] = []
+        level = [(group, None) for group in top_level]
+        while level:
+            next_level = []
+            incomplete = []
+            for group, parent_id in level:
+                if parent_id is not None:
+                    group = {**group, "parentId": group.get("parentId") or parent_id}
+                groups.append(group)
+                children = group.get("subGroups") or []
+                if group.get("subGroupCount", len(children)) > len(children):
+                    incomplete.append(group)
+                else:
+                    next_level.extend((child, group["id"]) for child in children)
+            fetched = await self.gather_limited(
+                self.fetch_all(f"/groups/{group['id']}/children", briefRepresentation="false")
+                for group in incomplete
+            )
+            for group, children in zip(incomplete, fetched):
+                next_level.extend((child, group["id"]) for child in children)
+            level = next_level
+        return groups
+
+    async def _fetch_members(self, path: str) -> Optional[List[Dict[str, Any]]]:
+        """Members listed at `path`, or None if Keycloak refuses the request (403, 404...)."""
+        try:
+            return await self.fetch_all(path, briefRepresentation="true")
+        except httpx.HTTPStatusError as e:
+            print(f"Warning: Directory sync could not list {path}: HTTP {e.response.status_code}")
+            return None
+
+    async def _full_sync(self) -> None:
+        started = time.monotonic()
+        started_ms = int(time.time() * 1000)
+        self._pending_writes = []
+        try:
+            users, groups, realm_roles, clients = await asyncio.gather(
+                self.fetch_all("/users"),
+                self.fetch_all("/groups", briefRepresentation="false"),
+                self.fetch_all("/roles"),
+                self.fetch_all("/clients"),
+            )
+
+            async def client_roles(c):
+                response = await get_client().get(f"{self.admin_realm_url}/clients/{c['id']}/roles", auth=self.auth)
+                if response.status_code != 200:
+                    return []
+                roles = response.json()
+                for role in roles:
+                    role.setdefault("clientRole", True)
+                    role.setdefault("containerId", c["id"])
+                return roles
+
+            groups = await self._fetch_group_tree(groups)
+            roles = list(realm_roles)
+            for chunk in await self.gather_limited(client_roles(c) for c in clients):
+                roles.extend(chunk)
+
+            members = await self.gather_limited(self._fetch_members(f"/groups/{g['id']}/members") for g in groups)
+            role_members = await self.gather_limited(self._fetch_members(self._role_users_path(r)) for r in roles)
+        except Exception:
+            self._pending_writes = None
+            raise
+
+        self.users = {u["id"]: u for u in users}
+        self.search_text = {u["id"]: user_search_text(u) for u in users}
+        self.username_ids = {u["username"].lower(): u["id"] for u in users if u.get("username")}
+        self.groups = {g["id"]: g for g in groups}
+        self.roles = {r["id"]: r for r in roles}
+        self.user_groups = {user_id: set() for user_id in self.users}
+        self.group_members = {}
+        self.user_roles = {user_id: set() for user_id in self.users}
+        self.role_users = {}
+        self.unsynced_groups = {group["id"] for group, group_members in zip(groups, members) if group_members is None}
+        self.unsynced_roles = {role["id"] for role, users_in_role in zip(roles, role_members) if users_in_role is None}
+        for group, group_members in zip(groups, members):
+            self.group_members[group["id"]] = {m["id"] for m in group_members or ()}
+            for m in group_members or ():
+                self.user_groups.setdefault(m["id"], set()).add(group["id"])
+        for role, users_in_role in zip(roles, role_members):
+            self.role_users[role["id"]] = {m["id"] for m in users_in_role or ()}
+            for m in users_in_role or ():
+                self.user_roles.setdefault(m["id"], set()).add(role["id"])
+
+        pending, self._pending_writes = self._pending_writes, None
+        for write in pending:
+            write()
+
+        self.version += 1
+        self.syncs += 1
+        self.last_sync = time.monotonic()
+        self.synced_from_ms = started_ms
+        self.last_sync_duration = time.monotonic() - started
+
+    async def _run_sync(self) -> None:
+        try:
+            await self._full_sync()
+        except Exception as e:
+            self.sync_errors += 1
+            self.consecutive_failures += 1
+            backoff = min(self.retry_backoff * 2 ** (self.consecutive_failures - 1), self.max_retry_backoff)
+            self.next_attempt_at = time.monotonic() + backoff
+            print(f"Warning: Directory sync failed (retrying in {backoff:.0f}s): {e}")
+            raise
+        self.consecutive_failures = 0
+        self.next_attempt_at = 0.0
+
+    def resync(self) -> asyncio.Task:
+        """Starts a full sync unless one is already running; returns the in-flight task."""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._run_sync())
+            self._sync_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._sync_task
+
+    async def ensure_fresh(self) -> bool:
+        """
+        Waits for the first sync if the mirror has never loaded; otherwise returns
+        immediately, kicking off a background resync if the data is too old.
+        Returns False without waiting if the mirror has never loaded and the
+        last attempt failed less than the backoff ago.
+        """
+        now = time.monotonic()
+        backing_off = now < self.next_attempt_at and not self.syncing
+        if not self.last_sync:
+            if backing_off:
+                return False
+            await asyncio.shield(self.resync())
+        elif now - self.last_sync > self.max_staleness and not backing_off:
+            self.resync()
+        return True
+
+    @property
+    def syncing(self) -> bool:
+        return self._sync_task is not None and not self._sync_task.done()
+
+    def mark_stale(self) -> None:
+        """Forces a background resync on next access (used when a write can't be mirrored)."""
+        if self.last_sync:
+            self.last_sync = time.monotonic() - self.max_staleness - 1
+
+    async def start(self) -> None:
+        self.resync()
+
+    async def stop(self) -> None:
+        if self._sync_task is not None and not self._sync_task.done():
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+
+    # --- Queries ---
+
+    def list_users(self) -> List[Dict[str, Any]]:
+        # Same order as Keycloak's /users listing
+        return sorted(self.users.values(), key=lambda u: u.get("username") or "")
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.users.get(user_id)
+
+    def user_group_names(self, user_id: str) -> List[str]:
+        return sorted(self.groups[g]["name"] for g in self.user_groups.get(user_id, ()) if g in self.groups)
+
+    def user_realm_role_names(self, user_id: str) -> List[str]:
+        return sorted(
+            self.roles[r]["name"] for r in self.user_roles.get(user_id, ())
+            if r in self.roles and not self.roles[r].get("clientRole")
+        )
+
+    @staticmethod
+    def is_top_level(group: Dict[str, Any]) -> bool:
+        return not group.get("parentId") and group.get("path", "").count("/") <= 1
+
+    def _subgroup_ids(self, group_id: str) -> List[str]:
+        path = self.groups.get(group_id, {}).get("path")
+        if not path:
+            return []
+        return [g["id"] for g in self.groups.values() if (g.get("path") or "").startswith(f"{path}/")]
+
+    def _move_subgroups(self, group_id: str, new_path: str) -> None:
+        """Rewrites the paths of `group_id`'s subgroups after it was renamed to `new_path`."""
+        old_path = self.groups[group_id].get("path")
+        if not old_path or old_path == new_path:
+            return
+        for subgroup_id in self._subgroup_ids(group_id):
+            subgroup = self.groups[subgroup_id]
+            subgroup["path"] = new_path + subgroup["path"][len(old_path):]
+
+    def list_groups(self) -> List[Dict[str, Any]]:
+        # Top-level groups only, as Keycloak's /groups lists them
+        return sorted(
+            (g for g in self.groups.values() if self.is_top_level(g)),
+            key=lambda g: g.get("name") or ""
+        )
+
+    def group_member_count(self, group_id: str) -> int:
+        return len(self.group_members.get(group_id, ()))
+
+    def list_roles(self) -> List[Dict[str, Any]]:
+        # Realm roles first, then client roles, as the live listing returns them
+        return sorted(self.roles.values(), key=lambda r: (bool(r.get("clientRole")), r.get("name") or ""))
+
+    def role_user_count(self, role_id: str) -> int:
+        return len(self.role_users.get(role_id, ()))
+
+    def find_users(
+        self,
+        search: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        group_id: Optional[str] = None,
+        role_id: Optional[str] = None,
+        sort: str = "username",
+    ) -> List[Dict[str, Any]]:
+        """
+        Users matching every given filter. Group and role filters start from the
+        membership indexes, so only their members are scanned.
+        """
+        candidates: Optional[Set[str]] = None
+        for members in (
+            self.group_members.get(group_id, set()) if group_id is not None else None,
+            self.role_users.get(role_id, set()) if role_id is not None else None,
+        ):
+            if members is not None:
+                candidates = members if candidates is None else candidates & members
+
+        users = []
+        for user_id in self.users if candidates is None else candidates:
+            user = self.users.get(user_id)
+            if user is None:
+                continue
+            if enabled is not None and user.get("enabled", False) != enabled:
+                continue
+            if search and not matches_search(self.search_text.get(user_id, ""), search):
+                continue
+            users.append(user)
+        return sort_users(users, sort)
+
+    def find_user_id(self, username: str) -> Optional[str]:
+        return self.username_ids.get(username.lower())
+
+    def find_group(self, name_or_id: str) -> Optional[Dict[str, Any]]:
+        if name_or_id in self.groups:
+            return self.groups[name_or_id]
+        # Names are matched against top-level groups, like the live filter
+        for group in self.groups.values():
+            if group.get("name") == name_or_id and self.is_top_level(group):
+                return group
+        return None
+
+    def find_realm_role(self, role_name: str) -> Optional[Dict[str, Any]]:
+        for role in self.roles.values():
+            if role["name"] == role_name and not role.get("clientRole"):
+                return role
+        return None
+
+    # --- Write-through ---
+
+    def _index_user(self, user_id: str, previous_username: Optional[str]) -> None:
+        user = self.users[user_id]
+        self.search_text[user_id] = user_search_text(user)
+        if previous_username and previous_username.lower() != (user.get("username") or "").lower():
+            self.username_ids.pop(previous_username.lower(), None)
+        if user.get("username"):
+            self.username_ids[user["username"].lower()] = user_id
+
+    def _write(self, change: Callable[[], None]) -> None:
+        change()
+        if self._pending_writes is not None:
+            self._pending_writes.append(change)
+        self.version += 1
+
+    def upsert_user(self, user: Dict[str, Any]) -> None:
+        def change():
+            user_id = user["id"]
+            is_new = user_id not in self.users
+            previous_username = self.users.get(user_id, {}).get("username")
+            self.users[user_id] = {**self.users.get(user_id, {}), **user}
+            self._index_user(user_id, previous_username)
+            self.user_groups.setdefault(user_id, set())
+            self.user_roles.setdefault(user_id, set())
+            if is_new:
+                # Keycloak maps every new user to the realm's default role
+                default_role = self.find_realm_role(f"default-roles-{self.realm}")
+                if default_role is not None:
+                    self.user_roles[user_id].add(default_role["id"])
+                    self.role_users.setdefault(default_role["id"], set()).add(user_id)
+        self._write(change)
+
+    def update_user(self, user_id: str, fields: Dict[str, Any]) -> None:
+        """Applies a partial update to a user we already mirror."""
+        def change():
+            if user_id in self.users:
+                previous_username = self.users[user_id].get("username")
+                self.users[user_id].update(fields)
+                self._index_user(user_id, previous_username)
+        self._write(change)
+
+    def remove_user(self, user_id: str) -> None:
+        def change():
+            user = self.users.pop(user_id, None)
+            self.search_text.pop(user_id, None)
+            if user and user.get("username"):
+                self.username_ids.pop(user["username"].lower(), None)
+            for group_id in self.user_groups.pop(user_id, set()):
+                self.group_members.get(group_id, set()).discard(user_id)
+            for role_id in self.user_roles.pop(user_id, set()):
+                self.role_users.get(role_id, set()).discard(user_id)
+        self._write(change)
+
+    def update_group(self, group_id: str, fields: Dict[str, Any]) -> None:
+        def change():
+            group = self.groups.get(group_id)
+            if group is not None:
+                if "name" in fields and group.get("path"):
+                    new_path = f"{group['path'].rsplit('/', 1)[0]}/{fields['name']}"
+                    self._move_subgroups(group_id, new_path)
+                    group["path"] = new_path
+                group.update(fields)
+        self._write(change)
+
+    def upsert_group(self, group: Dict[str, Any]) -> None:
+        def change():
+            merged = {**self.groups.get(group["id"], {}), **group}
+            merged.setdefault("path", f"/{merged.get('name')}")
+            if group["id"] in self.groups:
+                self._move_subgroups(group["id"], merged["path"])
+            self.groups[group["id"]] = merged
+            self.group_members.setdefault(group["id"], set())
+        self._write(change)
+
+    def remove_group(self, group_id: str) -> None:
+        def change():
+            # Keycloak deletes a group's subgroups with it
+            for removed_id in [group_id] + self._subgroup_ids(group_id):
+                self.groups.pop(removed_id, None)
+                for user_id in self.group_members.pop(removed_id, set()):
+                    self.user_groups.get(user_id, set()).discard(removed_id)
+        self._write(change)
+
+    def add_group_member(self, group_id: str, user_id: str) -> None:
+        def change():
+            self.group_members.setdefault(group_id, set()).add(user_id)
+            self.user_groups.setdefault(user_id, set()).add(group_id)
+        self._write(change)
+
+    def remove_group_member(self, group_id: str, user_id: str) -> None:
+        def change():
+            self.group_members.get(group_id, set()).discard(user_id)
+            self.user_groups.get(user_id, set()).discard(group_id)
+        self._write(change)
+
+    def set_user_roles(self, user_id: str, roles: List[Dict[str, Any]], client_id: Optional[str] = None) -> None:
+        """
+        Replaces a user's direct realm role mappings (or, with `client_id`, its
+        mappings for that client's roles) with `roles`.
+        """
+        def change():
+            current = self.user_roles.setdefault(user_id, set())
+            for role_id in list(current):
+                role = self.roles.get(role_id)
+                in_scope = (
+                    role is not None and role.get("containerId") == client_id
+                    if client_id else role is None or not role.get("clientRole")
+                )
+                if in_scope:
+                    current.discard(role_id)
+                    self.role_users.get(role_id, set()).discard(user_id)
+            for role in roles:
+                current.add(role["id"])
+                self.role_users.setdefault(role["id"], set()).add(user_id)
+        self._write(change)
+
+    def map_user_roles(self, user_id: str, role_ids: Iterable[str], mapped: bool = True) -> None:
+        """Adds (or with `mapped=False`, removes) direct role mappings for a user."""
+        role_ids = list(role_ids)
+
+        def change():
+            for role_id in role_ids:
+                if mapped:
+                    self.user_roles.setdefault(user_id, set()).add(role_id)
+                    self.role_users.setdefault(role_id, set()).add(user_id)
+                else:
+                    self.user_roles.get(user_id, set()).discard(role_id)
+                    self.role_users.get(role_id, set()).discard(user_id)
+        self._write(change)
+
+    def replace_roles(self, roles: List[Dict[str, Any]], client_id: Optional[str] = None) -> None:
+        """Replaces the realm roles (or one client's roles) with a freshly fetched list."""
+        def change():
+            fresh = {role["id"] for role in roles}
+            for role_id, role in list(self.roles.items()):
+                in_scope = role.get("containerId") == client_id if client_id else not role.get("clientRole")
+                if in_scope and role_id not in fresh:
+                    del self.roles[role_id]
+                    for user_id in self.role_users.pop(role_id, set()):
+                        self.user_roles.get(user_id, set()).discard(role_id)
+            for role in roles:
+                if client_id:
+                    role = {"clientRole": True, "containerId": client_id, **role}
+                self.roles[role["id"]] = {**self.roles.get(role["id"], {}), **role}
+                self.role_users.setdefault(role["id"], set())
+        self._write(change)
+
+    def upsert_role(self, role: Dict[str, Any]) -> None:
+        def change():
+            self.roles[role["id"]] = {**self.roles.get(role["id"], {}), **role}
+            self.role_users.setdefault(role["id"], set())
+        self._write(change)
+
+    def update_realm_role(self, role_name: str, updates: Dict[str, Any]) -> None:
+        def change():
+            role = self.find_realm_role(role_name)
+            if role is not None:
+                role.update(updates)
+        self._write(change)
+
+    def remove_realm_role(self, role_name: str) -> None:
+        def change():
+            role = self.find_realm_role(role_name)
+            if role is None:
+                return
+            del self.roles[role["id"]]
+            for user_id in self.role_users.pop(role["id"], set()):
+                self.user_roles.get(user_id, set()).discard(role["id"])
+        self._write(change)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self.users),
+            "groups": len(self.groups),
+            "roles": len(self.roles),
+            "version": self.version,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "syncing": self.syncing,
+            "seconds_since_sync": round(time.monotonic() - self.last_sync, 1) if self.last_sync else None,
+            "last_sync_duration": round(self.last_sync_duration, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(max(self.next_attempt_at - time.monotonic(), 0), 1),
+            "unsynced_groups": len(self.unsynced_groups),
+            "unsynced_roles": len(self.unsynced_roles),
+        }
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from directory import DirectoryMirror
+from http_client import get_client
+
+
+class AdminEventSync:
+    """
+    Keeps a DirectoryMirror current from the realm's admin events instead of
+    periodic full resyncs.
+
+    Every `poll_interval` seconds the worker reads `/admin-events` from its
+    cursor (the time of the newest event applied so far, persisted to
+    `cursor_path`), refetches only the users, groups and role mappings those
+    events touched, and writes them into the mirror. If the cursor hasn't been
+    checked within `max_cursor_age` seconds (events may have expired from
+    Keycloak meanwhile) or more than `max_events` piled up, it falls back to a
+    full resync and restarts from there.
+
+    Admin events must be enabled on the realm ("Save events" under Admin events
+    settings) and the service account needs the `view-events` role.
+    """
+
+    def __init__(
+        self,
+        directory: DirectoryMirror,
+        cursor_path: str,
+        poll_interval: float = 5.0,
+        max_cursor_age: float = 3600.0,
+        max_events: int = 2000,
+    ):
+        self.directory = directory
+        self.cursor_path = cursor_path
+        self.poll_interval = poll_interval
+        self.max_cursor_age = max_cursor_age
+        self.max_events = max_events
+
+        # Keycloak event time (ms) of the newest applied event, and the wall-clock
+        # ms at which a poll last confirmed nothing newer was missed
+        self.cursor_ms = 0
+        self.checked_at_ms = 0
+        # Events stamped exactly `cursor_ms` that were already applied (dateFrom is inclusive)
+        self._applied_at_cursor: Set[Tuple[Any, ...]] = set()
+        self._load_cursor()
+
+        self.polls = 0
+        self.poll_errors = 0
+        self.events_applied = 0
+        self.full_resyncs = 0
+        self._applied_window: "deque[Tuple[float, int]]" = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Cursor ---
+
+    def _load_cursor(self) -> None:
+        try:
+            with open(self.cursor_path) as f:
+                saved = json.load(f)
+            self.cursor_ms = int(saved.get("time", 0))
+            self.checked_at_ms = int(saved.get("checked_at", 0))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Warning: Ignoring unreadable admin event cursor {self.cursor_path}: {e}")
+
+    def _save_cursor(self) -> None:
+        tmp_path = f"{self.cursor_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"time": self.cursor_ms, "checked_at": self.checked_at_ms}, f)
+            os.replace(tmp_path, self.cursor_path)
+        except OSError as e:
+            print(f"Warning: Could not persist admin event cursor: {e}")
+
+    # --- Polling ---
+
+    @staticmethod
+    def _event_key(event: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (event.get("id"), event.get("time"), event.get("operationType"), event.get("resourcePath"))
+
+    async def _fetch_events(self, since_ms: int) -> Optional[List[Dict[str, Any]]]:
+        """Events at or after `since_ms`, oldest first; None if more than `max_events`."""
+        client = get_client()
+        # dateFrom only takes a day (in the server's timezone), so start a day early
+        # and filter to the exact time here
+        date_from = datetime.fromtimestamp(since_ms / 1000 - 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+        page_size = self.directory.page_size
+        events: List[Dict[str, Any]] = []
+        first = 0
+        while True:
+            response = await client.get(
+                f"{self.directory.admin_realm_url}/admin-events",
+                params={"dateFrom": date_from, "first": first, "max": page_size},
+                auth=self.directory.auth
+            )
+            response.raise_for_status()
+            page = response.json()
+            first += len(page)
+            # Keycloak returns newest first, so the first event older than the cursor ends the scan
+            newer = [
+                e for e in page
+                if e.get("time", 0) > since_ms
+                or e.get("time", 0) == since_ms and self._event_key(e) not in self._applied_at_cursor
+            ]
+            events.extend(newer)
+            if len(events) > self.max_events:
+                return None
+            if any(e.get("time", 0) < since_ms for e in page) or len(page) < page_size:
+                break
+        return sorted(events, key=lambda e: e.get("time", 0))
+
+    async def _full_resync(self, checked_at_ms: int) -> None:
+        await asyncio.shield(self.directory.resync())
+        self.full_resyncs += 1
+        self.cursor_ms = self.directory.synced_from_ms
+        self._applied_at_cursor = set()
+        self.checked_at_ms = checked_at_ms
+        self._save_cursor()
+
+    async def poll(self) -> int:
+        """Applies any new admin events to the mirror; returns how many were applied."""
+        poll_started_ms = int(time.time() * 1000)
+        if not self.directory.last_sync:
+            await asyncio.shield(self.directory.resync())
+
+        # A full sync (ours, or the mirror's own staleness resync) already covers everything before it started
+        if self.directory.synced_from_ms > self.cursor_ms:
+            self.cursor_ms = self.directory.synced_from_ms
+            self._applied_at_cursor = set()
+            self.checked_at_ms = max(self.checked_at_ms, self.directory.synced_from_ms)
+
+        if poll_started_ms - self.checked_at_ms > self.max_cursor_age * 1000:
+            await self._full_resync(poll_started_ms)
+            return 0
+
+        events = await self._fetch_events(self.cursor_ms)
+        if events is None:
+            await self._full_resync(poll_started_ms)
+            return 0
+
+        if events:
+            await self._apply(events)
+            newest = events[-1].get("time", 0)
+            if newest > self.cursor_ms:
+                self.cursor_ms = newest
+                self._applied_at_cursor = set()
+            self._applied_at_cursor.update(self._event_key(e) for e in events if e.get("time") == self.cursor_ms)
+            self.events_applied += len(events)
+            self._applied_window.append((time.monotonic(), len(events)))
+        self.checked_at_ms = poll_started_ms
+        self._save_cursor()
+        return len(events)
+
+    # --- Applying events ---
+
+    async def _get(self, path: str) -> Optional[Any]:
+        """GETs an admin resource; None if it no longer exists."""
+        response = await get_client().get(f"{self.directory.admin_realm_url}{path}", auth=self.directory.auth)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def _apply(self, events: List[Dict[str, Any]]) -> None:
+        # Collapse the batch to the latest operation per resource, so each is refetched once
+        users: Dict[str, str] = {}
+        groups: Dict[str, str] = {}
+        memberships: Dict[Tuple[str, str], str] = {}
+        realm_mappings: Set[str] = set()
+        client_mappings: Set[Tuple[str, str]] = set()
+        realm_roles_changed = False
+        changed_clients: Set[str] = set()
+
+        for event in events:
+            operation = event.get("operationType")
+            resource = event.get("resourceType")
+            parts = (event.get("resourcePath") or "").split("/")
+
+            if resource == "USER" and len(parts) == 2 and parts[0] == "users":
+                users[parts[1]] = operation
+            elif resource == "GROUP_MEMBERSHIP" and len(parts) == 4 and parts[0] == "users":
+                memberships[(parts[3], parts[1])] = operation
+            elif resource == "GROUP" and len(parts) == 2 and parts[0] == "groups":
+                groups[parts[1]] = operation
+            elif resource == "REALM_ROLE_MAPPING" and parts[0] == "users" and len(parts) >= 2:
+                realm_mappings.add(parts[1])
+            elif resource == "CLIENT_ROLE_MAPPING" and parts[0] == "users" and len(parts) >= 5:
+                client_mappings.add((parts[1], parts[4]))
+            elif resource == "REALM_ROLE":
+                realm_roles_changed = True
+            elif resource == "CLIENT_ROLE" and parts[0] == "clients" and len(parts) >= 2:
+                changed_clients.add(parts[1])
+
+        # Roles first, so mappings refetched below resolve against the new role set
+        if realm_roles_changed:
+            self.directory.replace_roles(await self.directory.fetch_all("/roles"))
+        client_role_lists = await self.directory.gather_limited(
+            self._get(f"/clients/{client_id}/roles") for client_id in changed_clients
+        )
+        for client_id, roles in zip(changed_clients, client_role_lists):
+            self.directory.replace_roles(roles or [], client_id=client_id)
+
+        for user_id, operation in users.items():
+            if operation == "DELETE":
+                self.directory.remove_user(user_id)
+        for group_id, operation in groups.items():
+            if operation == "DELETE":
+                self.directory.remove_group(group_id)
+
+        live_users = [user_id for user_id, operation in users.items() if operation != "DELETE"]
+        # Memberships in groups the mirror hasn't seen (e.g. a subgroup created since the last sync)
+        for (group_id, user_id), operation in memberships.items():
+            if operation != "DELETE" and group_id not in self.directory.groups:
+                groups.setdefault(group_id, "UPDATE")
+
+        live_groups = [group_id for group_id, operation in groups.items() if operation != "DELETE"]
+        fetched = await self.directory.gather_limited(
+            [self._get(f"/users/{user_id}") for user_id in live_users]
+            + [self._get(f"/groups/{group_id}") for group_id in live_groups]
+            + [self._get(f"/users/{user_id}/role-mappings/realm") for user_id in realm_mappings]
+            + [
+                self._get(f"/users/{user_id}/role-mappings/clients/{client_id}")
+                for user_id, client_id in client_mappings
+            ]
+        )
+        fetched_users = fetched[:len(live_users)]
+        fetched_groups = fetched[len(live_users):len(live_users) + len(live_groups)]
+        fetched_mappings = fetched[len(live_users) + len(live_groups):]
+
+        for user_id, user in zip(live_users, fetched_users):
+            if user is None:
+                self.directory.remove_user(user_id)
+            else:
+                self.directory.upsert_user(user)
+        for group_id, group in zip(live_groups, fetched_groups):
+            if group is None:
+                self.directory.remove_group(group_id)
+            else:
+                self.directory.upsert_group(group)
+
+        for (group_id, user_id), operation in memberships.items():
+            if operation == "DELETE":
+                self.directory.remove_group_member(group_id, user_id)
+            elif users.get(user_id) != "DELETE":
+                self.directory.add_group_member(group_id, user_id)
+
+        for user_id, roles in zip(realm_mappings, fetched_mappings):
+            if roles is not None:
+                self.directory.set_user_roles(user_id, roles)
+        for (user_id, client_id), roles in zip(client_mappings, fetched_mappings[len(realm_mappings):]):
+            if roles is not None:
+                self.directory.set_user_roles(user_id, roles, client_id=client_id)
+
+    # --- Lifecycle ---
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+                self.polls += 1
+            except Exception as e:
+                self.poll_errors += 1
+                print(f"Warning: Admin event sync failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        while self._applied_window and now - self._applied_window[0][0] > 60:
+            self._applied_window.popleft()
+        return {
+            "cursor": self.cursor_ms,
+            # How far behind Keycloak the mirror may be: time since a poll last confirmed it was current
+            "lag_seconds": round(max(time.time() * 1000 - self.checked_at_ms, 0) / 1000, 1) if self.checked_at_ms else None,
+            "events_applied": self.events_applied,
+            "events_per_second": round(sum(count for _, count in self._applied_window) / 60, 3),
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "full_resyncs": self.full_resyncs,
+        }
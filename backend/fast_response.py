@@ -0,0 +1,178 @@
+import gzip
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Opt-in: serialize straight to bytes (orjson when installed) instead of through jsonable_encoder
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+# gzip/br by Accept-Encoding, independent of the serializer
+COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+# Bodies smaller than this go out uncompressed; the CPU isn't worth it
+COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+
+def dumps(content: Any) -> bytes:
+    if not FAST_JSON_ENABLED:
+        # The same bytes FastAPI's default JSONResponse would send
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Picks br or gzip from an Accept-Encoding header (honouring q=0), preferring br."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    def allowed(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+class EncodedBody:
+    """A serialized JSON body plus its compressed variants, each computed at most once."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._variants: Dict[str, bytes] = {}
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        if encoding not in self._variants:
+            if encoding == "br":
+                self._variants[encoding] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                self._variants[encoding] = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+        return self._variants[encoding]
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self._variants.values())
+
+
+class SnapshotCache:
+    """
+    Bounded LRU of encoded response bodies keyed by ETag. Since an ETag only
+    names one version of one response, a hit can be sent as-is.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, EncodedBody]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[EncodedBody]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: EncodedBody) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": sum(entry.size for entry in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fast_json": FAST_JSON_ENABLED,
+            "compression": COMPRESSION_ENABLED,
+            "orjson": orjson is not None,
+            "brotli": brotli is not None,
+        }
+
+
+def encoded_response(request: Request, encoded: EncodedBody, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Sends `encoded`, compressed per the request's Accept-Encoding when it is large enough.
+    A compressed variant isn't byte-identical to the plain one, so its ETag is sent weak.
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = None
+    if COMPRESSION_ENABLED and len(encoded.body) >= COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        if "ETag" in headers and not headers["ETag"].startswith("W/"):
+            headers["ETag"] = f"W/{headers['ETag']}"
+    return Response(encoded.variant(encoding), media_type="application/json", headers=headers)
+
+
+def fast_json_response(
+    request: Request,
+    content: Any,
+    headers: Optional[Dict[str, str]] = None,
+    snapshots: Optional[SnapshotCache] = None,
+    snapshot_key: Optional[str] = None,
+) -> Any:
+    """
+    Serializes `content` (see `dumps`), compresses it per Accept-Encoding and
+    keeps the encoded body in `snapshots` under `snapshot_key` if given. With
+    both FAST_JSON_RESPONSES and RESPONSE_COMPRESSION off, hands `content`
+    back for FastAPI to encode.
+    """
+    if not (FAST_JSON_ENABLED or COMPRESSION_ENABLED):
+        return content
+    encoded = EncodedBody(dumps(content))
+    if snapshots is not None and snapshot_key:
+        snapshots.put(snapshot_key, encoded)
+    return encoded_response(request, encoded, headers)
+
+
+def snapshot_response(
+    request: Request, snapshots: SnapshotCache, snapshot_key: str, headers: Optional[Dict[str, str]] = None
+) -> Optional[Response]:
+    """The cached body for `snapshot_key` as a response, or None if there isn't one."""
+    if not (FAST_JSON_ENABLED or COMPRESSION_ENABLED):
+        return None
+    encoded = snapshots.get(snapshot_key)
+    if encoded is None:
+        return None
+    return encoded_response(request, encoded, headers)
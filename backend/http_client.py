@@ -0,0 +1,83 @@
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Connection pool settings for all outbound Keycloak traffic
+HTTP_MAX_CONNECTIONS = int(os.getenv("KEYCLOAK_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("KEYCLOAK_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("KEYCLOAK_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("KEYCLOAK_HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("KEYCLOAK_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("KEYCLOAK_HTTP2", "false").lower() == "true"
+
+_client: Optional[httpx.AsyncClient] = None
+_http2 = False
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("WARNING: KEYCLOAK_HTTP2 is set but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        return False
+
+
+def create_client() -> httpx.AsyncClient:
+    global _http2
+    _http2 = HTTP2_ENABLED and _http2_available()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        http2=_http2,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide Keycloak client. It is normally opened by the app's
+    startup hook; if something needs it earlier it is created on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+async def start() -> None:
+    get_client()
+
+
+async def stop() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    stats = {
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+        "http2": _http2,
+        "open": 0,
+        "idle": 0,
+        "active": 0,
+        "waiting": 0,
+    }
+    # httpx doesn't expose pool internals publicly; read them from the httpcore pool if present
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+
+    connections = list(pool.connections)
+    stats["open"] = len([c for c in connections if not c.is_closed()])
+    stats["idle"] = len([c for c in connections if c.is_idle()])
+    stats["active"] = stats["open"] - stats["idle"]
+    stats["waiting"] = len([r for r in getattr(pool, "_requests", []) if r.is_queued()])
+    return stats
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+from jose import jwk
+from jose.exceptions import JWKError
+
+from http_client import get_client
+
+
+class JWKSKeyStore:
+    """
+    Holds the realm's signing keys, parsed once and indexed by `kid`.
+
+    The hot path (`get_key` for a known kid) is a dict lookup. The network is
+    only touched on the first load, by the periodic background refresh, and
+    when a token arrives signed with a kid we have not seen yet (rate limited
+    by `min_refetch_interval` so garbage kids can't hammer Keycloak).
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        refresh_interval: float = 300.0,
+        min_refetch_interval: float = 10.0,
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+
+        self._keys: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+        self._last_fetch = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._rotation_listeners: List[Callable[[Iterable[str]], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    async def _fetch(self) -> None:
+        response = await get_client().get(self.jwks_url)
+        response.raise_for_status()
+
+        keys = {}
+        for key_data in response.json().get("keys", []):
+            # Keycloak also publishes encryption keys (use=enc); only signing keys matter here
+            if key_data.get("use", "sig") != "sig" or "kid" not in key_data:
+                continue
+            try:
+                keys[key_data["kid"]] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except JWKError as e:
+                print(f"Warning: Skipping unusable JWKS key {key_data.get('kid')}: {e}")
+
+        retired = set(self._keys) - set(keys)
+        self._keys = keys
+        self.fetches += 1
+
+        if retired:
+            for listener in self._rotation_listeners:
+                listener(retired)
+
+    def add_rotation_listener(self, listener: Callable[[Iterable[str]], None]) -> None:
+        """`listener` is called with the kids that disappeared from the JWKS."""
+        self._rotation_listeners.append(listener)
+
+    async def refresh(self, force: bool = True) -> None:
+        """Re-download the JWKS. Concurrent callers share one in-flight fetch."""
+        requested_at = time.monotonic()
+        async with self._lock:
+            # Someone else refreshed while we were waiting for the lock
+            if self._last_fetch >= requested_at:
+                return
+            if not force and requested_at - self._last_fetch < self.min_refetch_interval:
+                return
+            self._last_fetch = time.monotonic()
+            try:
+                await self._fetch()
+            except (httpx.HTTPError, ValueError) as e:
+                self.fetch_errors += 1
+                print(f"Warning: Failed to refresh JWKS from {self.jwks_url}: {e}")
+
+    async def get_key(self, kid: str):
+        """Returns the parsed key for `kid`, or None if Keycloak doesn't know it either."""
+        key = self._keys.get(kid)
+        if key is not None:
+            self.hits += 1
+            return key
+
+        self.misses += 1
+        await self.refresh(force=not self._keys)
+        return self._keys.get(kid)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kids": sorted(self._keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "seconds_since_fetch": round(time.monotonic() - self._last_fetch, 1) if self._last_fetch else None,
+        }
@@ -1,21 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from keycloak import KeycloakOpenID
 from jose import jwt, JWTError
-from pydantic import BaseModel, EmailStr
-from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, EmailStr, ValidationError
+from typing import AsyncIterator, Dict, Any, List, Optional
  
 import uvicorn
-from sqlalchemy import create_engine, Column, String, Integer, inspect
+from sqlalchemy import create_engine, Column, String, Integer, Boolean, Index, inspect, update, delete, text, or_, and_, exists
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import StatementError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker, Session, aliased
 from dotenv import load_dotenv
 import os
+import asyncio
 import httpx
 import json 
+import base64
+import hashlib
 from datetime import datetime
+from urllib.parse import quote
+
+from jwks_cache import JWKSKeyStore
+from token_cache import IntrospectionCache, VerifiedClaimsCache
+from admin_token import AdminTokenAuth, AdminTokenManager
+from directory import DirectoryMirror, UsernameCache, USER_SORT_KEYS, matches_search, sort_users, user_search_text
+from directory_events import AdminEventSync
+from permissions import PERMISSIONS, PermissionIndex
+from fast_response import SnapshotCache, fast_json_response, snapshot_response
+from db_executor import DatabaseExecutor
+from user_provisioning import UserProvisioner
+from model_cache import VisibleModelsCache
+from model_proxy import (
+    ModelURLError, ProviderClients, auth_headers, forwarded_request_headers, forwarded_response_headers,
+    pin_model_url, validate_model_url
+)
+from model_health import ModelHealthProber
+from bulk_import import (
+    CSV_MEDIA_TYPES, DuplexStreamingResponse, LineTooLongError, batched, iter_as_completed, iter_import_rows, prepend
+)
+import http_client
+from http_client import get_client
 
 load_dotenv()
 
@@ -29,6 +57,10 @@ class UserCreate(BaseModel):
     groupId: Optional[str] = None 
     status: Optional[str] = "Active"
 
+class UserImportRow(UserCreate):
+    # Bulk-imported users may be created without a password (e.g. to set one via reset email)
+    password: Optional[str] = None
+
 class UserUpdate(BaseModel):
     # Used for full user update (PUT)
     username: Optional[str] = None
@@ -52,6 +84,27 @@ class RoleCreate(BaseModel):
     name: str
     description: Optional[str] = None
 
+class UserFilter(BaseModel):
+    # Same meaning as the GET /admin/users query parameters
+    search: Optional[str] = None
+    enabled: Optional[bool] = None
+    group: Optional[str] = None
+    role: Optional[str] = None
+
+class BulkUserSelection(BaseModel):
+    # Either explicit ids or a filter
+    user_ids: Optional[List[str]] = None
+    filter: Optional[UserFilter] = None
+    dry_run: bool = False
+
+class BulkUserStatusUpdate(BulkUserSelection):
+    enabled: bool
+
+class BulkRoleMapping(BaseModel):
+    roles: List[str]
+    group_ids: List[str] = []
+    user_ids: List[str] = []
+
 class AddMembers(BaseModel):
     member_usernames: List[str]
     
@@ -80,8 +133,19 @@ if not DATABASE_URL:
     print("WARNING: DATABASE_URL not set in environment. Using in-memory SQLite for testing.")
     DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(DATABASE_URL)
+# Connection pool; DB work runs on at most pool_size + max_overflow worker threads (see db_executor)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+db_executor = DatabaseExecutor(SessionLocal, max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW)
 Base = declarative_base()
 
 # --- Database Model ---
@@ -98,6 +162,18 @@ class RolePermission(Base):
     permission_name = Column(String, index=True)
     enabled = Column(String)
 
+    # One row per matrix cell, so concurrent writers upsert instead of duplicating it
+    __table_args__ = (
+        Index("ux_role_permissions_role_permission", "role_name", "permission_name", unique=True),
+    )
+
+class DataVersion(Base):
+    # One row per dataset, bumped in the same transaction as every write to it.
+    # Lets workers and HTTP caches tell whether anything changed without re-reading it.
+    __tablename__ = "data_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 class LanguageModel(Base):
     __tablename__ = "language_models"
     id = Column(Integer, primary_key=True, index=True)
@@ -106,14 +182,51 @@ class LanguageModel(Base):
     api_key = Column(String)
     api_url = Column(String)
     created_by = Column(String)
-    is_public = Column(String) # "true" or "false"
+    is_public = Column(Boolean, nullable=False, default=False)
+
+    # Serve the visibility query (own models, else public ones) in id order for keyset paging
+    __table_args__ = (
+        Index("ix_language_models_created_by_id", "created_by", "id"),
+        Index("ix_language_models_is_public_id", "is_public", "id"),
+    )
 
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI()
 
+def migrate_language_models(inspector) -> None:
+    """Converts a text is_public column to BOOLEAN and adds missing indexes."""
+    is_public = next(c for c in inspector.get_columns("language_models") if c["name"] == "is_public")
+    if not isinstance(is_public["type"], Boolean):
+        if engine.dialect.name != "postgresql":
+            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            print("!!! DATABASE SCHEMA MISMATCH: 'language_models.is_public' is not BOOLEAN.")
+            print("!!! Please delete the `test.db` file and restart the backend.")
+            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            return
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE language_models ALTER COLUMN is_public TYPE BOOLEAN USING is_public = 'true'"
+            ))
+        print("Migrated 'language_models.is_public' to BOOLEAN.")
+    for index in LanguageModel.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def migrate_role_permissions() -> None:
+    """Drops duplicate cells (keeping the newest row) and adds the unique (role, permission) index."""
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM role_permissions WHERE id NOT IN "
+            "(SELECT MAX(id) FROM role_permissions GROUP BY role_name, permission_name)"
+        )).rowcount
+    if removed:
+        print(f"Removed {removed} duplicate row(s) from 'role_permissions'.")
+    for index in RolePermission.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
 @app.on_event("startup")
 def startup_event():
+    migrate_role_permissions()
     inspector = inspect(engine)
     if not inspector.has_table("language_models"):
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
@@ -135,6 +248,9 @@ def startup_event():
             print(f"!!! Missing columns:  {missing}")
         print("!!! Please delete the `test.db` file and restart the backend.")
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        return
+
+    migrate_language_models(inspector)
 
 # --- CORS Middleware ---
 origins = [
@@ -149,50 +265,69 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# --- Dependency to get DB session ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # --- Keycloak Configuration ---
 KEYCLOAK_SERVER_URL = "http://localhost:8080"
 KEYCLOAK_REALM = "cybersecurity-realm"
 KEYCLOAK_CLIENT_ID = "cybersecurity-frontend"
 KEYCLOAK_ADMIN_USERNAME = os.getenv("KEYCLOAK_ADMIN_USERNAME", "admin")
 KEYCLOAK_ADMIN_PASSWORD = os.getenv("KEYCLOAK_ADMIN_PASSWORD", "admin")
+# Confidential client allowed to introspect realm tokens (the frontend client is public)
+KEYCLOAK_INTROSPECT_CLIENT_ID = os.getenv("KEYCLOAK_INTROSPECT_CLIENT_ID", "cybersecurity-backend")
+KEYCLOAK_INTROSPECT_CLIENT_SECRET = os.getenv("KEYCLOAK_INTROSPECT_CLIENT_SECRET", "")
+
+# Realm signing keys, loaded from the JWKS endpoint and refreshed in the background
+jwks_store = JWKSKeyStore(
+    f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs",
+    refresh_interval=float(os.getenv("JWKS_REFRESH_INTERVAL", "300")),
+)
 
-# Initialize Keycloak client
-keycloak_openid = KeycloakOpenID(
-    server_url=KEYCLOAK_SERVER_URL,
-    client_id=KEYCLOAK_CLIENT_ID,
-    realm_name=KEYCLOAK_REALM,
+# Tokens that already passed signature/audience checks, kept until they expire
+claims_cache = VerifiedClaimsCache(max_size=int(os.getenv("CLAIMS_CACHE_SIZE", "10000")))
+jwks_store.add_rotation_listener(claims_cache.invalidate_kids)
+
+# Introspection answers for routes that must notice revoked sessions; active
+# tokens are rechecked at most every INTROSPECTION_CACHE_MAX_TTL seconds
+introspection_cache = IntrospectionCache(
+    max_size=int(os.getenv("INTROSPECTION_CACHE_SIZE", "10000")),
+    max_ttl=float(os.getenv("INTROSPECTION_CACHE_MAX_TTL", "60")),
 )
+if not KEYCLOAK_INTROSPECT_CLIENT_SECRET:
+    print("Warning: KEYCLOAK_INTROSPECT_CLIENT_SECRET is not set; destructive admin routes will answer 503")
+
+# One pooled HTTP client for all Keycloak traffic, opened and closed with the app
+@app.on_event("startup")
+async def start_keycloak_clients():
+    await http_client.start()
+    await jwks_store.start()
+
+@app.on_event("shutdown")
+async def stop_keycloak_clients():
+    await jwks_store.stop()
+    await http_client.stop()
 
 # --- JWT Token Verification ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_keycloak_public_key():
-    # Cache this key for better performance in a real app
-    return (
-        "-----BEGIN PUBLIC KEY-----\n"
-        f"{keycloak_openid.public_key()}"
-        "\n-----END PUBLIC KEY-----"
-    )
-
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    cached_claims = claims_cache.get(token)
+    if cached_claims is not None:
+        return cached_claims
+
     try:
-        public_key = get_keycloak_public_key()
+        kid = jwt.get_unverified_header(token).get("kid")
+        public_key = await jwks_store.get_key(kid) if kid else None
+        if public_key is None:
+            raise JWTError("Unknown signing key")
         payload = jwt.decode(
             token,
             public_key,
             algorithms=["RS256"],
             audience=KEYCLOAK_CLIENT_ID, # Ensure audience matches
         )
+        claims_cache.put(token, payload, kid)
         return payload
     except JWTError as e:
         raise HTTPException(
@@ -214,75 +349,353 @@ async def verify_admin_role(current_user: dict = Depends(get_current_user)):
     
     return current_user
 
-async def get_admin_token():
-    """Get admin access token from Keycloak using admin credentials (Master Realm)"""
+async def introspect_token(token: str) -> Dict[str, Any]:
+    """Ask Keycloak whether the token is still active, caching the answer"""
+    token_data = introspection_cache.get(token)
+    if token_data is not None:
+        return token_data
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/realms/master/protocol/openid-connect/token", 
-                data={
-                    "grant_type": "password",
-                    "client_id": "admin-cli", 
-                    "username": KEYCLOAK_ADMIN_USERNAME,
-                    "password": KEYCLOAK_ADMIN_PASSWORD
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                print(f"Failed to get admin token: {response.text}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to authenticate with Keycloak admin. Check credentials. HTTP: {response.status_code}"
-                )
-            
-            return response.json()["access_token"]
-            
+        client = get_client()
+        response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token/introspect",
+            data={
+                "token": token,
+                "client_id": KEYCLOAK_INTROSPECT_CLIENT_ID,
+                "client_secret": KEYCLOAK_INTROSPECT_CLIENT_SECRET
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
     except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Error verifying token: {str(e)}")
+
+    if response.status_code != 200:
+        # The introspection client was refused, not the caller's token
+        raise HTTPException(status_code=502, detail="Keycloak token introspection failed")
+
+    token_data = response.json()
+    introspection_cache.put(token, token_data)
+    return token_data
+
+async def verify_admin_role_with_revocation(
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(verify_admin_role),
+):
+    """
+    verify_admin_role plus a cached introspection call, so a token whose
+    session was revoked in Keycloak is refused before it expires. Used by
+    destructive routes; the local signature check still runs first so forged
+    tokens never reach Keycloak. Fails closed (503) while no introspection
+    client is configured.
+    """
+    if not KEYCLOAK_INTROSPECT_CLIENT_SECRET:
         raise HTTPException(
-            status_code=500,
-            detail=f"Error connecting to Keycloak Master Realm: {str(e)}"
+            status_code=503,
+            detail="Token revocation check is not configured (KEYCLOAK_INTROSPECT_CLIENT_SECRET)"
         )
+    token_data = await introspect_token(token)
+    if not token_data.get("active"):
+        raise HTTPException(
+            status_code=401,
+            detail="Token is not active",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return current_user
+
+# --- Permission checks ---
+def load_enabled_permissions():
+    with SessionLocal() as db:
+        return db.query(RolePermission.role_name, RolePermission.permission_name).filter(RolePermission.enabled == "true").all()
+
+def get_data_version(db: Session, name: str) -> int:
+    row = db.get(DataVersion, name)
+    return row.version if row else 0
+
+def bump_data_version(db: Session, name: str) -> None:
+    """Bumps `name`'s version as part of the caller's transaction."""
+    bumped = db.execute(
+        update(DataVersion)
+        .where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1)
+    )
+    if bumped.rowcount == 0:
+        db.add(DataVersion(name=name, version=1))
+
+def load_permission_version() -> int:
+    with SessionLocal() as db:
+        return get_data_version(db, "role_permissions")
+
+permission_index = PermissionIndex(
+    load_enabled_permissions,
+    load_permission_version,
+    check_interval=float(os.getenv("PERMISSION_VERSION_CHECK_INTERVAL", "2")),
+    run_blocking=db_executor.run,
+)
+
+def require_permission(permission: str):
+    """
+    Dependency that lets the request through if any of the caller's realm roles
+    has `permission` enabled in the role-permission matrix. Admins always pass.
+    """
+    async def check_permission(current_user: dict = Depends(get_current_user)):
+        roles = current_user.get("realm_access", {}).get("roles", [])
+        if "admin" in roles:
+            return current_user
+
+        await permission_index.refresh()
+        if not permission_index.allows(roles, permission):
+            raise HTTPException(
+                status_code=403,
+                detail=f"Access denied. '{permission}' permission required."
+            )
+        return current_user
+
+    return check_permission
+
+# Master realm admin token, cached and refreshed ahead of expiry. Requests made
+# with `auth=admin_auth` get it attached and are retried once on a 401.
+admin_tokens = AdminTokenManager(
+    f"{KEYCLOAK_SERVER_URL}/realms/master/protocol/openid-connect/token",
+    {
+        "grant_type": "password",
+        "client_id": "admin-cli",
+        "username": KEYCLOAK_ADMIN_USERNAME,
+        "password": KEYCLOAK_ADMIN_PASSWORD
+    },
+)
+admin_auth = AdminTokenAuth(admin_tokens)
 
 # --- UTILITY FUNCTIONS for Keycloak API Calls ---
-async def fetch_keycloak_data(url: str, admin_token: str) -> Dict[str, Any]:
-    async with httpx.AsyncClient() as client:
+# Upper bound on concurrent per-item Keycloak requests made by a single endpoint
+KEYCLOAK_FANOUT_CONCURRENCY = int(os.getenv("KEYCLOAK_FANOUT_CONCURRENCY", "16"))
+
+async def map_concurrently(func, items, limit: int = KEYCLOAK_FANOUT_CONCURRENCY) -> List[Any]:
+    """Awaits `func(item)` for every item, at most `limit` at a time. Results keep the input order."""
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+async def iter_concurrently(func, items, limit: int = KEYCLOAK_FANOUT_CONCURRENCY) -> AsyncIterator[Any]:
+    """
+    Like map_concurrently, but yields each result as soon as it (and everything
+    before it) is done, keeping at most `limit` calls in flight.
+    """
+    pending = []
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(func(item)))
+            if len(pending) >= max(limit, 1):
+                yield await pending.pop(0)
+        while pending:
+            yield await pending.pop(0)
+    finally:
+        # The consumer went away (e.g. the client closed the stream)
+        for task in pending:
+            task.cancel()
+
+async def fetch_keycloak_data(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    client = get_client()
+    response = await client.get(
+        url,
+        params=params,
+        headers={"Content-Type": "application/json"},
+        auth=admin_auth
+    )
+    if response.status_code == 200:
+        return response.json()
+    elif response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Resource not found in Keycloak.")
+    else:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Failed to fetch data from Keycloak. HTTP {response.status_code}: {response.text}"
+        )
+        
+# Page size used when counting members/users by walking a paged listing
+KEYCLOAK_COUNT_PAGE_SIZE = int(os.getenv("KEYCLOAK_COUNT_PAGE_SIZE", "500"))
+
+async def count_keycloak_items(url: str) -> int:
+    """
+    Counts the entries of a paged Keycloak listing (e.g. group members) using
+    brief representations, so only ids and usernames cross the wire.
+    Returns the count so far if Keycloak stops answering with 200.
+    """
+    client = get_client()
+    count = 0
+    while True:
         response = await client.get(
             url,
-            headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"},
-            timeout=10.0
+            params={"first": count, "max": KEYCLOAK_COUNT_PAGE_SIZE, "briefRepresentation": "true"},
+            auth=admin_auth
         )
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 404:
-            raise HTTPException(status_code=404, detail="Resource not found in Keycloak.")
-        else:
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to fetch data from Keycloak. HTTP {response.status_code}: {response.text}"
-            )
+        if response.status_code != 200:
+            return count
+        page_size = len(response.json())
+        count += page_size
+        if page_size < KEYCLOAK_COUNT_PAGE_SIZE:
+            return count
             
+# --- Paging ---
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Opaque continuation token handed back to clients in X-Next-Cursor."""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(state, dict):
+            raise ValueError("cursor is not an object")
+        return state
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def cursor_int(state: Dict[str, Any], key: str, default: int, minimum: int = 0) -> int:
+    """An integer field of a decoded cursor; cursors come from clients, so anything else is a 400."""
+    try:
+        value = int(state.get(key, default))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if value < minimum:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+def cursor_field(state: Dict[str, Any], key: str, kind: type) -> Any:
+    """A field of a decoded cursor that must be None or of type `kind`."""
+    value = state.get(key)
+    if value is not None and not isinstance(value, kind):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+def version_etag(*parts: Any) -> str:
+    """
+    Strong ETag from the data version(s) a response was built from plus anything
+    else that shapes it (query, caller), so it can be checked before doing the work.
+    """
+    return '"' + hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32] + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # Let the browser keep the body but revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers.update(etag_headers(etag))
+
+# Encoded bodies of recent ETag-tagged list responses, served again without re-encoding
+response_snapshots = SnapshotCache(max_entries=int(os.getenv("RESPONSE_SNAPSHOT_CACHE_SIZE", "64")))
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def ndjson_lines(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield json.dumps(row).encode() + b"\n"
+
+# --- Directory mirror ---
+# Local copy of users/groups/roles that answers the admin listings; see directory.py
+DIRECTORY_MIRROR_ENABLED = os.getenv("DIRECTORY_MIRROR_ENABLED", "true").lower() == "true"
+# Incremental sync from Keycloak admin events (needs admin events enabled on the realm)
+DIRECTORY_EVENT_SYNC_ENABLED = os.getenv("DIRECTORY_EVENT_SYNC_ENABLED", "false").lower() == "true"
+
+directory = DirectoryMirror(
+    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}",
+    admin_auth,
+    KEYCLOAK_REALM,
+    # With event sync on, full resyncs are only a safety net
+    max_staleness=float(os.getenv("DIRECTORY_MAX_STALENESS", "3600" if DIRECTORY_EVENT_SYNC_ENABLED else "300")),
+    concurrency=KEYCLOAK_FANOUT_CONCURRENCY,
+    page_size=KEYCLOAK_COUNT_PAGE_SIZE,
+    retry_backoff=float(os.getenv("DIRECTORY_RETRY_BACKOFF", "5")),
+    max_retry_backoff=float(os.getenv("DIRECTORY_MAX_RETRY_BACKOFF", "300")),
+)
+
+directory_events = AdminEventSync(
+    directory,
+    cursor_path=os.getenv("DIRECTORY_EVENT_CURSOR_FILE", "directory_events_cursor.json"),
+    poll_interval=float(os.getenv("DIRECTORY_EVENT_POLL_INTERVAL", "5")),
+    max_cursor_age=float(os.getenv("DIRECTORY_EVENT_MAX_CURSOR_AGE", "3600")),
+)
+
+@app.on_event("startup")
+async def start_directory_mirror():
+    if DIRECTORY_MIRROR_ENABLED:
+        await directory.start()
+        if DIRECTORY_EVENT_SYNC_ENABLED:
+            await directory_events.start()
+
+@app.on_event("shutdown")
+async def stop_directory_mirror():
+    await directory_events.stop()
+    await directory.stop()
+
+# Username -> id lookups made against Keycloak, for when the mirror can't answer
+username_cache = UsernameCache(
+    max_size=int(os.getenv("USERNAME_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USERNAME_CACHE_TTL", "600")),
+)
+
+async def directory_ready() -> bool:
+    """True when reads can be served from the mirror; falls back to live Keycloak calls otherwise."""
+    if not DIRECTORY_MIRROR_ENABLED:
+        return False
+    try:
+        return await directory.ensure_fresh()
+    except Exception as e:
+        print(f"Warning: Directory mirror unavailable, querying Keycloak directly: {e}")
+        return False
+
 # --- ENDPOINTS (User/Auth) ---
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Cybersecurity Backend API!"}
 
+def insert_missing_users(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Inserts `rows`, skipping any whose username or email already exists."""
+    dialect_insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+    db.execute(dialect_insert(User).on_conflict_do_nothing(), rows)
+    db.commit()
+
+async def write_user_batch(rows: List[Dict[str, Any]]) -> None:
+    await db_executor.run_session(insert_missing_users, rows)
+
+# Local user rows for callers of /protected, created off the request path
+user_provisioner = UserProvisioner(
+    write_user_batch,
+    flush_interval=float(os.getenv("USER_PROVISIONING_FLUSH_INTERVAL", "1")),
+    batch_size=int(os.getenv("USER_PROVISIONING_BATCH_SIZE", "500")),
+)
+
+@app.on_event("startup")
+async def start_user_provisioning():
+    await user_provisioner.start()
+
+@app.on_event("shutdown")
+async def stop_user_provisioning():
+    await user_provisioner.stop()
+
 @app.get("/protected")
-async def read_protected_data(
-    current_user: dict = Depends(get_current_user), 
-    db: Session = Depends(get_db)
-):
+async def read_protected_data(current_user: dict = Depends(get_current_user)):
     username = current_user.get('preferred_username')
     email = current_user.get('email')
 
-    db_user = db.query(User).filter(User.username == username).first()
-
-    if not db_user:
-        new_user = User(username=username, email=email)
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+    user_provisioner.observe(username, email)
 
     return {
         "message": f"Hello, {username}! This is protected data.",
@@ -306,122 +719,333 @@ async def get_admin_info(current_user: dict = Depends(get_current_user)):
         "sub": current_user.get("sub")
     }
 
+@app.get("/admin/metrics")
+async def get_metrics(current_user: dict = Depends(verify_admin_role)):
+    """
+    Cache and connection counters for this backend process (Admin only).
+    """
+    return {
+        "jwks": jwks_store.stats(),
+        "claims_cache": claims_cache.stats(),
+        "introspection_cache": introspection_cache.stats(),
+        "admin_token": admin_tokens.stats(),
+        "http_pool": http_client.pool_stats(),
+        "directory": directory.stats(),
+        "directory_events": directory_events.stats(),
+        "username_cache": username_cache.stats(),
+        "permissions": permission_index.stats(),
+        "response_snapshots": response_snapshots.stats(),
+        "db_executor": db_executor.stats(),
+        "user_provisioning": user_provisioner.stats(),
+        "model_cache": visible_models_cache.stats(),
+        "model_proxy": provider_clients.stats(),
+        "model_health": model_prober.stats(),
+        "db_pool": engine.pool.status(),
+    }
+
 # --- USER MANAGEMENT ENDPOINTS ---
 
+def format_user_summary(
+    user: Dict[str, Any], group_names: List[str], role_names: List[str], current_user: dict
+) -> Dict[str, Any]:
+    """The row shape the UsersTab expects."""
+    createdBy = user.get("attributes", {}).get("createdBy", [current_user.get("preferred_username")])[0]
+
+    return {
+        "id": user.get("id"),
+        "username": user.get("username"),
+        "email": user.get("email"),
+        "firstName": user.get("firstName"),
+        "lastName": user.get("lastName"),
+        "enabled": user.get("enabled", False),
+        "addedGroups": ", ".join(group_names),
+        "roles": ", ".join(role_names),
+        "createdTimestamp": user.get("createdTimestamp"),
+        "createdBy": createdBy
+    }
+
+async def enrich_user(user: Dict[str, Any], group_map: Dict[str, str], current_user: dict) -> Dict[str, Any]:
+    """
+    Formats a Keycloak user for the UsersTab, fetching its groups and realm roles.
+    A failure for one user is reported on that user instead of failing the whole list.
+    """
+    user_id = user.get("id")
+    client = get_client()
+    groups, roles, error = [], [], None
+
+    try:
+        groups_response, roles_response = await asyncio.gather(
+            client.get(
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups",
+                auth=admin_auth
+            ),
+            client.get(
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/role-mappings/realm",
+                auth=admin_auth
+            ),
+        )
+        groups = groups_response.json() if groups_response.status_code == 200 else []
+        roles = roles_response.json() if roles_response.status_code == 200 else []
+    except httpx.HTTPError as e:
+        print(f"Warning: Failed to fetch groups/roles for user {user_id}: {str(e)}")
+        error = str(e) or type(e).__name__
+
+    formatted_user = format_user_summary(
+        user,
+        [group_map.get(g["id"], g["name"]) for g in groups],
+        [r["name"] for r in roles],
+        current_user
+    )
+    if error:
+        formatted_user["enrichmentError"] = error
+    return formatted_user
+
+
+async def stream_all_users(enrich) -> AsyncIterator[Dict[str, Any]]:
+    """Walks Keycloak's /users page by page, yielding enriched users as they finish."""
+    first = 0
+    while True:
+        page = await fetch_keycloak_data(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users",
+            params={"first": first, "max": KEYCLOAK_COUNT_PAGE_SIZE}
+        )
+        async for row in iter_concurrently(enrich, page):
+            yield row
+        first += len(page)
+        if len(page) < KEYCLOAK_COUNT_PAGE_SIZE:
+            return
+
+async def fetch_keycloak_pages(url: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Every entry of a paged Keycloak listing, KEYCLOAK_COUNT_PAGE_SIZE at a time."""
+    items: List[Dict[str, Any]] = []
+    while True:
+        page = await fetch_keycloak_data(url, params={**(params or {}), "first": len(items), "max": KEYCLOAK_COUNT_PAGE_SIZE})
+        items.extend(page)
+        if len(page) < KEYCLOAK_COUNT_PAGE_SIZE:
+            return items
+
+def find_users_mirrored(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Users matching `filters`, answered from the directory mirror's indexes."""
+    group_match = directory.find_group(filters["group"]) if filters["group"] is not None else None
+    role_match = directory.find_realm_role(filters["role"]) if filters["role"] is not None else None
+    if filters["group"] is not None and group_match is None or filters["role"] is not None and role_match is None:
+        return []
+    return directory.find_users(
+        search=filters["search"],
+        enabled=filters["enabled"],
+        group_id=group_match["id"] if group_match else None,
+        role_id=role_match["id"] if role_match else None,
+        sort=filters["sort"] or "username",
+    )
+
+async def find_users_live(filters: Dict[str, Any], groups_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Un-enriched users matching `filters`, straight from Keycloak. Group and role
+    filters list only that group's members / that role's users.
+    """
+    base_url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}"
+    sources = []
+    if filters["group"] is not None:
+        group = next((g for g in groups_data if filters["group"] in (g["id"], g["name"])), None)
+        if group is None:
+            return []
+        sources.append(fetch_keycloak_pages(f"{base_url}/groups/{group['id']}/members"))
+    if filters["role"] is not None:
+        sources.append(fetch_keycloak_pages(f"{base_url}/roles/{quote(filters['role'], safe='')}/users"))
+    if not sources:
+        # Keycloak matches its search string as one phrase; narrow by the longest term and match all terms below
+        terms = (filters["search"] or "").split()
+        params = {"search": max(terms, key=len)} if terms else {}
+        if filters["enabled"] is not None:
+            params["enabled"] = str(filters["enabled"]).lower()
+        sources.append(fetch_keycloak_pages(f"{base_url}/users", params))
+
+    try:
+        listings = await asyncio.gather(*sources)
+    except HTTPException as e:
+        if e.status_code == 404:
+            # Unknown role
+            return []
+        raise
+
+    users = listings[0]
+    for listing in listings[1:]:
+        ids = {u["id"] for u in listing}
+        users = [u for u in users if u["id"] in ids]
+    if filters["enabled"] is not None:
+        users = [u for u in users if u.get("enabled", False) == filters["enabled"]]
+    if filters["search"]:
+        users = [u for u in users if matches_search(user_search_text(u), filters["search"])]
+    return sort_users(users, filters["sort"] or "username")
+
 @app.get("/admin/users", response_model=List[Dict[str, Any]])
 async def get_all_users(
+    request: Request,
+    response: Response,
+    first: Optional[int] = Query(None, ge=0),
+    max_results: Optional[int] = Query(None, alias="max", ge=1, le=MAX_PAGE_SIZE),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None,
+    enabled: Optional[bool] = None,
+    group: Optional[str] = None,
+    role: Optional[str] = None,
+    sort: Optional[str] = None,
     current_user: dict = Depends(verify_admin_role)
 ):
     """
-    Get all users from Keycloak and their associated group/role info (Admin only).
+    Get users from Keycloak and their associated group/role info (Admin only).
+
+    Without paging parameters the whole realm is returned. `first`/`max` (or
+    `limit`, or the opaque `cursor` from a previous page's X-Next-Cursor header)
+    return one page. `search` matches username, email and name; `enabled`,
+    `group` (name or id) and `role` (realm role name) filter; `sort` is
+    `username` or `createdTimestamp`, prefixed with "-" for descending.
+    With `Accept: application/x-ndjson` users are streamed one per line as soon
+    as each is ready.
     """
-    admin_token = await get_admin_token()
-    
-    # 1. Get ALL users
-    users_data = await fetch_keycloak_data(
-        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users", admin_token
-    )
-    
-    # 2. Get ALL groups to map user groups
-    groups_data = await fetch_keycloak_data(
-        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups", admin_token
-    )
-    group_map = {group["id"]: group["name"] for group in groups_data}
-    
-    # 3. Format output
-    formatted_users = []
-    async with httpx.AsyncClient() as client:
-        for user in users_data:
-            user_id = user.get("id")
-            
-            # Fetch groups for the user
-            groups_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups",
-                headers={"Authorization": f"Bearer {admin_token}"}
-            )
-            groups = groups_response.json() if groups_response.status_code == 200 else []
-            
-            # Fetch realm roles for the user
-            roles_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/role-mappings/realm",
-                headers={"Authorization": f"Bearer {admin_token}"}
+    filters = {"search": search, "enabled": enabled, "group": group, "role": role, "sort": sort}
+    if cursor:
+        # The cursor carries the query it was issued for
+        state = decode_cursor(cursor)
+        first = cursor_int(state, "first", 0)
+        max_results = cursor_int(state, "max", DEFAULT_PAGE_SIZE, minimum=1)
+        filters = {key: cursor_field(state, key, bool if key == "enabled" else str) for key in filters}
+    max_results = max_results or limit
+    if first is not None or max_results is not None:
+        first, max_results = first or 0, min(max_results or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    paged = max_results is not None
+    if filters["sort"] is not None and filters["sort"].lstrip("-") not in USER_SORT_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort must be one of {', '.join(USER_SORT_KEYS)} (optionally prefixed with '-')"
+        )
+    filtered = any(value is not None for value in filters.values())
+
+    etag = None
+    if await directory_ready():
+        # createdBy falls back to the caller's username, so the caller is part of the tag
+        etag = version_etag(
+            "users", directory.generation, first, max_results, sorted(filters.items()),
+            wants_ndjson(request), current_user.get("preferred_username")
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        cached = None if wants_ndjson(request) else snapshot_response(request, response_snapshots, etag, etag_headers(etag))
+        if cached is not None:
+            return cached
+        if filtered:
+            users = find_users_mirrored(filters)
+        else:
+            users = directory.list_users()
+        if paged:
+            users = users[first:first + max_results]
+
+        async def rows():
+            for user in users:
+                yield format_user_summary(
+                    user,
+                    directory.user_group_names(user["id"]),
+                    directory.user_realm_role_names(user["id"]),
+                    current_user
+                )
+    else:
+        # Map group ids to names once, then enrich each user with groups and roles,
+        # KEYCLOAK_FANOUT_CONCURRENCY users at a time
+        groups_data = await fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups")
+        group_map = {group["id"]: group["name"] for group in groups_data}
+
+        async def enrich(user):
+            return await enrich_user(user, group_map, current_user)
+
+        if filtered:
+            # Filter and sort the plain user records first; only the page gets enriched
+            users = await find_users_live(filters, groups_data)
+            if paged:
+                users = users[first:first + max_results]
+
+            def rows():
+                return iter_concurrently(enrich, users)
+        elif paged:
+            users = await fetch_keycloak_data(
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users",
+                params={"first": first, "max": max_results}
             )
-            roles = roles_response.json() if roles_response.status_code == 200 else []
-            
-            createdBy = user.get("attributes", {}).get("createdBy", [current_user.get("preferred_username")])[0] 
-
-            formatted_users.append({
-                "id": user_id,
-                "username": user.get("username"),
-                "email": user.get("email"),
-                "firstName": user.get("firstName"),
-                "lastName": user.get("lastName"),
-                "enabled": user.get("enabled", False),
-                "addedGroups": ", ".join([group_map.get(g["id"], g["name"]) for g in groups]),
-                "roles": ", ".join([r["name"] for r in roles]),
-                "createdTimestamp": user.get("createdTimestamp"),
-                "createdBy": createdBy
-            })
-            
-    return formatted_users
+
+            def rows():
+                return iter_concurrently(enrich, users)
+        else:
+            def rows():
+                return stream_all_users(enrich)
+
+    headers = {}
+    if etag:
+        headers.update(etag_headers(etag))
+    if paged and len(users) == max_results:
+        headers["X-Next-Cursor"] = encode_cursor({"first": first + max_results, "max": max_results, **{key: value for key, value in filters.items() if value is not None}})
+
+    if wants_ndjson(request):
+        return StreamingResponse(ndjson_lines(rows()), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    response.headers.update(headers)
+    return fast_json_response(request, [row async for row in rows()], headers, response_snapshots, etag)
+
+def format_user_detail(user: Dict[str, Any], role_names: List[str]) -> Dict[str, Any]:
+    return {
+        "id": user.get("id"),
+        "username": user.get("username"),
+        "email": user.get("email"),
+        "firstName": user.get("firstName"),
+        "lastName": user.get("lastName"),
+        "enabled": user.get("enabled", False),
+        "emailVerified": user.get("emailVerified", False),
+        "createdTimestamp": user.get("createdTimestamp"),
+        "roles": role_names
+    }
 
 @app.get("/admin/users/{user_id}")
 async def get_user_by_id(
     user_id: str,
     current_user: dict = Depends(verify_admin_role)
 ) -> Dict[str, Any]:
+    # Users created directly in the Keycloak console may not be mirrored yet; those go to Keycloak
+    if await directory_ready() and directory.get_user(user_id) is not None:
+        return format_user_detail(directory.get_user(user_id), directory.user_realm_role_names(user_id))
+
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        # Get user details
+        response = await client.get(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth
+        )
         
-        async with httpx.AsyncClient() as client:
-            # Get user details
-            response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Failed to fetch user: {response.text}"
-                )
-            
-            user = response.json()
-            
-            # Get user's roles
-            roles_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/role-mappings/realm",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                timeout=10.0
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Failed to fetch user: {response.text}"
             )
-            
-            role_names = []
-            if roles_response.status_code == 200:
-                user_roles = roles_response.json()
-                role_names = [role["name"] for role in user_roles]
-            
-            return {
-                "id": user.get("id"),
-                "username": user.get("username"),
-                "email": user.get("email"),
-                "firstName": user.get("firstName"),
-                "lastName": user.get("lastName"),
-                "enabled": user.get("enabled", False),
-                "emailVerified": user.get("emailVerified", False),
-                "createdTimestamp": user.get("createdTimestamp"),
-                "roles": role_names
-            }
-            
+        
+        user = response.json()
+        
+        # Get user's roles
+        roles_response = await client.get(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/role-mappings/realm",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth
+        )
+        
+        role_names = []
+        if roles_response.status_code == 200:
+            user_roles = roles_response.json()
+            role_names = [role["name"] for role in user_roles]
+        
+        return format_user_detail(user, role_names)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -431,6 +1055,77 @@ async def get_user_by_id(
         )
 
 
+def build_keycloak_user(user_data: UserCreate, created_by: Optional[str]) -> Dict[str, Any]:
+    kc_user = {
+        "username": user_data.username,
+        "email": user_data.email,
+        "firstName": user_data.firstName,
+        "lastName": user_data.lastName,
+        "enabled": user_data.status == "Active",
+        "attributes": {
+            "createdBy": [created_by]
+        }
+    }
+    if user_data.password:
+        kc_user["credentials"] = [
+            {
+                "type": "password",
+                "value": user_data.password,
+                "temporary": False
+            }
+        ]
+    return kc_user
+
+async def create_keycloak_user(user_data: UserCreate, created_by: Optional[str]) -> str:
+    """
+    Creates the user, then adds it to `groupId` if given. Returns the new user id.
+    Raises HTTPException 409 if the username or email is taken.
+    """
+    kc_user = build_keycloak_user(user_data, created_by)
+
+    client = get_client()
+    create_response = await client.post(
+        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users",
+        headers={"Content-Type": "application/json"},
+        auth=admin_auth,
+        json=kc_user
+    )
+
+    if create_response.status_code == 409:
+         raise HTTPException(status_code=409, detail="User with this username or email already exists in Keycloak.")
+
+    if create_response.status_code != 201:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Failed to create user in Keycloak. HTTP {create_response.status_code}: {create_response.text}"
+        )
+
+    location_url = create_response.headers.get("Location")
+    if not location_url:
+         raise HTTPException(status_code=500, detail="Keycloak did not return the location of the new user.")
+         
+    user_id = location_url.split("/")[-1]
+
+    kc_user.pop("credentials", None)
+    directory.upsert_user({
+        **kc_user,
+        "id": user_id,
+        "createdTimestamp": int(datetime.now().timestamp() * 1000)
+    })
+
+    if user_data.groupId:
+        group_response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups/{user_data.groupId}",
+            auth=admin_auth
+        )
+
+        if group_response.status_code not in [204, 200]:
+            print(f"Warning: Failed to assign user {user_id} to group {user_data.groupId}. Status: {group_response.status_code}")
+        else:
+            directory.add_group_member(user_data.groupId, user_id)
+
+    return user_id
+
 @app.post("/admin/users/create")
 async def create_user_with_group(
     user_data: UserCreate,
@@ -440,66 +1135,8 @@ async def create_user_with_group(
     Creates a user in Keycloak and optionally assigns them to a group (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
-        # 1. Construct Keycloak user object
-        kc_user = {
-            "username": user_data.username,
-            "email": user_data.email,
-            "firstName": user_data.firstName,
-            "lastName": user_data.lastName,
-            "enabled": user_data.status == "Active",
-            "attributes": {
-                "createdBy": [current_user.get("preferred_username")]
-            },
-            "credentials": [
-                {
-                    "type": "password",
-                    "value": user_data.password,
-                    "temporary": False
-                }
-            ]
-        }
-        
-        async with httpx.AsyncClient() as client:
-            # 2. Create the user
-            create_response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json=kc_user,
-                timeout=10.0
-            )
-            
-            if create_response.status_code == 409:
-                 raise HTTPException(status_code=409, detail="User with this username or email already exists in Keycloak.")
-            
-            if create_response.status_code != 201:
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Failed to create user in Keycloak. HTTP {create_response.status_code}: {create_response.text}"
-                )
-
-            location_url = create_response.headers.get("Location")
-            if not location_url:
-                 raise HTTPException(status_code=500, detail="Keycloak did not return the location of the new user.")
-                 
-            user_id = location_url.split("/")[-1]
-
-            # 3. Assign user to group (if groupId is provided)
-            if user_data.groupId:
-                group_response = await client.put(
-                    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups/{user_data.groupId}",
-                    headers={"Authorization": f"Bearer {admin_token}"},
-                    timeout=10.0
-                )
-
-                if group_response.status_code not in [204, 200]:
-                    print(f"Warning: Failed to assign user {user_id} to group {user_data.groupId}. Status: {group_response.status_code}")
-
-            return {"message": "User created and group assigned successfully", "user_id": user_id}
+        user_id = await create_keycloak_user(user_data, current_user.get("preferred_username"))
+        return {"message": "User created and group assigned successfully", "user_id": user_id}
 
     except HTTPException:
         raise
@@ -509,6 +1146,179 @@ async def create_user_with_group(
             detail=f"An unexpected error occurred during user creation: {str(e)}"
         )
 
+# Users created at once by a bulk import, and users per partial-import request
+USER_IMPORT_CONCURRENCY = int(os.getenv("USER_IMPORT_CONCURRENCY", str(KEYCLOAK_FANOUT_CONCURRENCY)))
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "200"))
+USER_IMPORT_BATCH_CONCURRENCY = int(os.getenv("USER_IMPORT_BATCH_CONCURRENCY", "2"))
+
+def parse_import_row(row_number: int, row: Optional[Dict[str, Any]], error: Optional[str]):
+    """Returns `(UserImportRow, None)` or `(None, failed status)` for a parsed input row."""
+    if row is None:
+        return None, {"row": row_number, "status": "failed", "error": error}
+    try:
+        return UserImportRow(**row), None
+    except ValidationError as e:
+        return None, {
+            "row": row_number,
+            "username": row.get("username"),
+            "status": "failed",
+            "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        }
+
+async def import_user(item, created_by: Optional[str]) -> List[Dict[str, Any]]:
+    row_number, row, error = item
+    user_data, failure = parse_import_row(row_number, row, error)
+    if failure:
+        return [failure]
+
+    result = {"row": row_number, "username": user_data.username}
+    try:
+        result["id"] = await create_keycloak_user(user_data, created_by)
+        result["status"] = "created"
+    except HTTPException as e:
+        result["status"] = "conflict" if e.status_code == 409 else "failed"
+        result["error"] = e.detail
+    except httpx.HTTPError as e:
+        result["status"] = "failed"
+        result["error"] = str(e) or type(e).__name__
+    except Exception as e:
+        # One bad row must not end the whole import stream
+        print(f"Warning: Importing row {row_number} failed unexpectedly: {e!r}")
+        result["status"] = "failed"
+        result["error"] = f"Unexpected error: {e}"
+    return [result]
+
+async def import_user_batch(batch, created_by: Optional[str], group_paths: Dict[str, Optional[str]]) -> List[Dict[str, Any]]:
+    """
+    Creates a batch of users with one call to the realm's partialImport API.
+    Existing users are skipped by Keycloak and reported as conflicts.
+    """
+    results, rows = [], []
+    for row_number, row, error in batch:
+        user_data, failure = parse_import_row(row_number, row, error)
+        if failure:
+            results.append(failure)
+        else:
+            rows.append((row_number, user_data))
+    if not rows:
+        return results
+
+    # partialImport places users in groups by path, not id
+    for group_id in {user_data.groupId for _, user_data in rows if user_data.groupId} - group_paths.keys():
+        group = directory.groups.get(group_id) if await directory_ready() else None
+        if group is None:
+            try:
+                group = await fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}")
+            except HTTPException:
+                group = None
+        group_paths[group_id] = group.get("path") if group else None
+
+    kc_users = []
+    for _, user_data in rows:
+        kc_user = build_keycloak_user(user_data, created_by)
+        if group_paths.get(user_data.groupId):
+            kc_user["groups"] = [group_paths[user_data.groupId]]
+        kc_users.append(kc_user)
+
+    try:
+        response = await get_client().post(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/partialImport",
+            json={"ifResourceExists": "SKIP", "users": kc_users},
+            auth=admin_auth
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"partialImport failed. HTTP {response.status_code}: {response.text}")
+        outcomes = {
+            outcome.get("resourceName"): outcome
+            for outcome in response.json().get("results", [])
+            if outcome.get("resourceType") == "USER"
+        }
+    except Exception as e:
+        if not isinstance(e, (HTTPException, httpx.HTTPError)):
+            print(f"Warning: partialImport batch failed unexpectedly: {e!r}")
+        error = e.detail if isinstance(e, HTTPException) else str(e) or type(e).__name__
+        return results + [
+            {"row": row_number, "username": user_data.username, "status": "failed", "error": error}
+            for row_number, user_data in rows
+        ]
+
+    for (row_number, user_data), kc_user in zip(rows, kc_users):
+        # Keycloak stores usernames lower-cased
+        outcome = outcomes.get(user_data.username.lower()) or outcomes.get(user_data.username) or {}
+        result = {"row": row_number, "username": user_data.username}
+        if outcome.get("action") == "ADDED":
+            result.update(status="created", id=outcome.get("id"))
+            kc_user.pop("credentials", None)
+            kc_user.pop("groups", None)
+            directory.upsert_user({**kc_user, "id": outcome.get("id"), "createdTimestamp": int(datetime.now().timestamp() * 1000)})
+            if group_paths.get(user_data.groupId):
+                directory.add_group_member(user_data.groupId, outcome.get("id"))
+            elif user_data.groupId:
+                result["warning"] = f"Group {user_data.groupId} not found; user was created without it"
+        elif outcome.get("action") == "SKIPPED":
+            result.update(status="conflict", error="User with this username or email already exists in Keycloak.")
+        else:
+            result.update(status="failed", error="Keycloak did not report a result for this user")
+        results.append(result)
+    return results
+
+@app.post("/admin/users/import")
+async def import_users(
+    request: Request,
+    input_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    partial_import: bool = False,
+    current_user: dict = Depends(verify_admin_role)
+):
+    """
+    Bulk-creates users from a CSV (with a header row) or NDJSON request body (Admin only).
+
+    Rows have the fields of /admin/users/create (password optional). The body
+    is parsed as it arrives and users are created USER_IMPORT_CONCURRENCY at a
+    time; with `partial_import=true` they are sent in batches of
+    USER_IMPORT_BATCH_SIZE through Keycloak's partialImport API instead.
+    The format comes from `format` or the Content-Type (text/csv, else NDJSON).
+    The response streams one NDJSON status line per row (`created`, `conflict`
+    or `failed`, in completion order) followed by a summary line. Lines longer
+    than MAX_IMPORT_LINE_LENGTH are refused: with 413 if the first row is
+    too long, otherwise the import stops with a `failed` line.
+    """
+    if input_format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        input_format = "csv" if content_type in CSV_MEDIA_TYPES else "ndjson"
+    created_by = current_user.get("preferred_username")
+    rows = iter_import_rows(request, input_format)
+    # Read the first row before answering, so a body that is one endless line gets a 413
+    try:
+        rows = prepend(await rows.__anext__(), rows)
+    except StopAsyncIteration:
+        pass
+    except LineTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    if partial_import:
+        group_paths: Dict[str, Optional[str]] = {}
+        results = iter_as_completed(
+            lambda batch: import_user_batch(batch, created_by, group_paths),
+            batched(rows, USER_IMPORT_BATCH_SIZE),
+            USER_IMPORT_BATCH_CONCURRENCY
+        )
+    else:
+        results = iter_as_completed(lambda item: import_user(item, created_by), rows, USER_IMPORT_CONCURRENCY)
+
+    async def report():
+        summary = {"created": 0, "conflict": 0, "failed": 0}
+        try:
+            async for batch_results in results:
+                for result in batch_results:
+                    summary[result["status"]] += 1
+                    yield json.dumps(result).encode() + b"\n"
+        except LineTooLongError as e:
+            summary["failed"] += 1
+            yield json.dumps({"status": "failed", "error": f"{e}; import stopped"}).encode() + b"\n"
+        yield json.dumps({"summary": summary}).encode() + b"\n"
+
+    return DuplexStreamingResponse(report(), media_type=NDJSON_MEDIA_TYPE)
+
 
 @app.put("/admin/users/{user_id}")
 async def update_user(
@@ -520,48 +1330,45 @@ async def update_user(
     Updates an existing user in Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-
         # 1. Get current user data from Keycloak to ensure we don't overwrite required fields
-        async with httpx.AsyncClient() as client:
-            get_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
-                headers={"Authorization": f"Bearer {admin_token}"},
-                timeout=5.0
-            )
-            if get_response.status_code == 404:
-                raise HTTPException(status_code=404, detail="User not found in Keycloak.")
-            if get_response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Failed to fetch user before update.")
+        client = get_client()
+        get_response = await client.get(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            auth=admin_auth
+        )
+        if get_response.status_code == 404:
+            raise HTTPException(status_code=404, detail="User not found in Keycloak.")
+        if get_response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Failed to fetch user before update.")
 
-            existing_user = get_response.json()
+        existing_user = get_response.json()
 
-            # 2. Merge existing data with new data, excluding unset fields
-            update_data = user_data.model_dump(exclude_unset=True) 
-            
-            updated_payload = {**existing_user, **update_data}
-
-            # 3. Send the PUT request to Keycloak
-            update_response = await client.put(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json=updated_payload,
-                timeout=10.0
-            )
+        # 2. Merge existing data with new data, excluding unset fields
+        update_data = user_data.model_dump(exclude_unset=True) 
+        
+        updated_payload = {**existing_user, **update_data}
+
+        # 3. Send the PUT request to Keycloak
+        update_response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json=updated_payload
+        )
 
-            if update_response.status_code == 409:
-                raise HTTPException(status_code=409, detail="Update failed: Username or email already exists.")
-            
-            if update_response.status_code not in [204, 200]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to update user in Keycloak. HTTP {update_response.status_code}: {update_response.text}"
-                )
+        if update_response.status_code == 409:
+            raise HTTPException(status_code=409, detail="Update failed: Username or email already exists.")
+        
+        if update_response.status_code not in [204, 200]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to update user in Keycloak. HTTP {update_response.status_code}: {update_response.text}"
+            )
 
-            return {"message": f"User {user_id} updated successfully."}
+        directory.upsert_user({**updated_payload, "id": user_id})
+        if user_data.username is not None:
+            username_cache.forget_user(user_id)
+        return {"message": f"User {user_id} updated successfully."}
 
     except HTTPException:
         raise
@@ -582,27 +1389,23 @@ async def update_user_status(
     Updates only the enabled status of a user in Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
-        async with httpx.AsyncClient() as client:
-            # PUT to update the user with only the enabled field
-            update_response = await client.put(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json={"enabled": status_update.enabled},
-                timeout=10.0
-            )
+        client = get_client()
+        # PUT to update the user with only the enabled field
+        update_response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json={"enabled": status_update.enabled}
+        )
 
-            if update_response.status_code not in [204, 200]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to update user status in Keycloak. HTTP {update_response.status_code}: {update_response.text}"
-                )
+        if update_response.status_code not in [204, 200]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to update user status in Keycloak. HTTP {update_response.status_code}: {update_response.text}"
+            )
 
-            return {"message": f"User {user_id} status updated to {status_update.enabled}."}
+        directory.update_user(user_id, {"enabled": status_update.enabled})
+        return {"message": f"User {user_id} status updated to {status_update.enabled}."}
 
     except HTTPException:
         raise
@@ -616,31 +1419,30 @@ async def update_user_status(
 @app.delete("/admin/users/{user_id}")
 async def delete_user(
     user_id: str,
-    current_user: dict = Depends(verify_admin_role)
+    current_user: dict = Depends(verify_admin_role_with_revocation)
 ):
     """
     Deletes a user from Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
-                headers={"Authorization": f"Bearer {admin_token}"},
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.delete(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            auth=admin_auth
+        )
 
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="User not found in Keycloak.")
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="User not found in Keycloak.")
 
-            if response.status_code not in [204]: # Keycloak typically returns 204 No Content for success
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to delete user in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
+        if response.status_code not in [204]: # Keycloak typically returns 204 No Content for success
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete user in Keycloak. HTTP {response.status_code}: {response.text}"
+            )
 
-            return {"message": f"User {user_id} deleted successfully."}
+        directory.remove_user(user_id)
+        username_cache.forget_user(user_id)
+        return {"message": f"User {user_id} deleted successfully."}
 
     except HTTPException:
         raise
@@ -651,55 +1453,183 @@ async def delete_user(
         )
 
 
+async def select_bulk_users(selection: BulkUserSelection) -> List[Dict[str, Any]]:
+    """
+    The users a bulk operation applies to: `{"id", "username"}` for each matched
+    user, or `{"id", "status": "not_found"}` for explicit ids that don't exist.
+    """
+    if (selection.user_ids is None) == (selection.filter is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of user_ids or filter.")
+
+    if selection.filter is not None:
+        filters = {**selection.filter.model_dump(), "sort": None}
+        if all(value is None for value in filters.values()):
+            raise HTTPException(status_code=400, detail="filter must set at least one criterion.")
+        if await directory_ready():
+            users = find_users_mirrored(filters)
+        else:
+            groups_data = []
+            if filters["group"] is not None:
+                groups_data = await fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups")
+            users = await find_users_live(filters, groups_data)
+        return [{"id": user["id"], "username": user.get("username")} for user in users]
+
+    use_directory = await directory_ready()
+
+    async def lookup(user_id: str) -> Dict[str, Any]:
+        user = directory.get_user(user_id) if use_directory else None
+        if user is None:
+            try:
+                user = await fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}")
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+                return {"id": user_id, "status": "not_found"}
+        return {"id": user_id, "username": user.get("username")}
+
+    return await map_concurrently(lookup, list(dict.fromkeys(selection.user_ids)))
+
+async def apply_bulk_user_change(
+    selection: BulkUserSelection, current_user: dict, change, done_status: str
+) -> Dict[str, Any]:
+    """
+    Runs `change(user_id)` (returning the Keycloak response) for every selected
+    user, KEYCLOAK_FANOUT_CONCURRENCY at a time, and reports a result per user.
+    With `dry_run` only the matched set is returned. The caller's own account is
+    always skipped.
+    """
+    targets = await select_bulk_users(selection)
+
+    async def apply(target: Dict[str, Any]) -> Dict[str, Any]:
+        if target.get("status") == "not_found":
+            return target
+        if target["id"] == current_user.get("sub"):
+            return {**target, "status": "skipped", "error": "Refusing to change the caller's own account"}
+        if selection.dry_run:
+            return {**target, "status": "matched"}
+        try:
+            response = await change(target["id"])
+        except httpx.HTTPError as e:
+            return {**target, "status": "failed", "error": str(e) or type(e).__name__}
+        if response.status_code in [200, 204]:
+            return {**target, "status": done_status}
+        if response.status_code == 404:
+            return {**target, "status": "not_found"}
+        return {**target, "status": "failed", "error": f"HTTP {response.status_code}: {response.text}"}
+
+    results = await map_concurrently(apply, targets)
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"dryRun": selection.dry_run, "matched": len(targets), "counts": counts, "results": results}
+
+@app.post("/admin/users/bulk/status")
+async def bulk_update_user_status(
+    update: BulkUserStatusUpdate,
+    current_user: dict = Depends(verify_admin_role_with_revocation)
+):
+    """
+    Enables or disables many users, given as `user_ids` or a `filter` (Admin only).
+    Set `dry_run` to only list the users that would change.
+    """
+    client = get_client()
+
+    async def change(user_id: str):
+        response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json={"enabled": update.enabled}
+        )
+        if response.status_code in [200, 204]:
+            directory.update_user(user_id, {"enabled": update.enabled})
+        return response
+
+    return await apply_bulk_user_change(update, current_user, change, "updated")
+
+@app.post("/admin/users/bulk/delete")
+async def bulk_delete_users(
+    selection: BulkUserSelection,
+    current_user: dict = Depends(verify_admin_role_with_revocation)
+):
+    """
+    Deletes many users, given as `user_ids` or a `filter` (Admin only).
+    Set `dry_run` to only list the users that would be deleted.
+    """
+    client = get_client()
+
+    async def change(user_id: str):
+        response = await client.delete(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}",
+            auth=admin_auth
+        )
+        if response.status_code == 204:
+            directory.remove_user(user_id)
+            username_cache.forget_user(user_id)
+        return response
+
+    return await apply_bulk_user_change(selection, current_user, change, "deleted")
+
+
 # --- GROUP MANAGEMENT ENDPOINTS ---
 
+def format_group_row(group: Dict[str, Any], member_count: int) -> Dict[str, Any]:
+    return {
+        "id": group["id"],
+        "name": group.get("name"),
+        "memberCount": member_count,
+        "description": (group.get("attributes") or {}).get("description", [""])[0],
+        "path": group.get("path"),
+        "createdBy": "Admin/System" 
+    }
+
+async def format_group(group: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds description and member count to a group from the /groups listing."""
+    group_url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group['id']}"
+
+    if "attributes" not in group:
+        # Older Keycloak versions ignore briefRepresentation=false on the listing
+        detail_response = await get_client().get(group_url, auth=admin_auth)
+        if detail_response.status_code != 200:
+            return format_group_row({**group, "attributes": {}}, 0)
+        group = {**group, **detail_response.json()}
+
+    return format_group_row(group, await count_keycloak_items(f"{group_url}/members"))
+
 @app.get("/admin/groups", response_model=List[Dict[str, Any]])
 async def get_all_groups(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(verify_admin_role)
 ):
     """
     Get all groups from Keycloak with member count and description (Admin only).
     """
-    admin_token = await get_admin_token()
-    groups_data = await fetch_keycloak_data(
-        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups", admin_token
-    )
-    
-    formatted_groups = []
-    async with httpx.AsyncClient() as client:
-        for group in groups_data:
-            group_id = group["id"]
-            
-            # Fetch group details to get description and members count
-            detail_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
-                headers={"Authorization": f"Bearer {admin_token}"}
-            )
-            
-            member_count = 0
-            description = ""
-            if detail_response.status_code == 200:
-                detail = detail_response.json()
-                # Fetch members list to get accurate count
-                members_response = await client.get(
-                    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}/members",
-                    headers={"Authorization": f"Bearer {admin_token}"}
-                )
-                if members_response.status_code == 200:
-                    member_count = len(members_response.json())
-                
-                description = detail.get("attributes", {}).get("description", [""])[0]
-            
-            formatted_groups.append({
-                "id": group_id,
-                "name": group.get("name"),
-                "memberCount": member_count,
-                "description": description,
-                "path": group.get("path"),
-                "createdBy": "Admin/System" 
-            })
-            
-    return formatted_groups
+    if await directory_ready():
+        etag = version_etag("groups", directory.generation)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        cached = snapshot_response(request, response_snapshots, etag, etag_headers(etag))
+        if cached is not None:
+            return cached
+        set_etag(response, etag)
+        return fast_json_response(
+            request,
+            [
+                format_group_row(group, directory.group_member_count(group["id"]))
+                for group in directory.list_groups()
+            ],
+            etag_headers(etag),
+            response_snapshots,
+            etag
+        )
+
+    # The full representation carries the description attribute, saving a detail request per group
+    groups_data = await fetch_keycloak_data(
+        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups?briefRepresentation=false"
+    )
+    
+    return fast_json_response(request, await map_concurrently(format_group, groups_data))
 
 @app.post("/admin/groups/create")
 async def create_group(
@@ -710,41 +1640,45 @@ async def create_group(
     Creates a new group in Keycloak and sets its description (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        # 1. Create the Group
+        create_response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json={"name": group_data.name}
+        )
+        
+        if create_response.status_code == 409:
+            raise HTTPException(status_code=409, detail="Group with this name already exists.")
         
-        async with httpx.AsyncClient() as client:
-            # 1. Create the Group
-            create_response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups",
-                headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"},
-                json={"name": group_data.name},
-                timeout=10.0
+        if create_response.status_code != 201:
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Failed to create group in Keycloak. HTTP {create_response.status_code}: {create_response.text}"
             )
-            
-            if create_response.status_code == 409:
-                raise HTTPException(status_code=409, detail="Group with this name already exists.")
-            
-            if create_response.status_code != 201:
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Failed to create group in Keycloak. HTTP {create_response.status_code}: {create_response.text}"
-                )
-            
-            location_url = create_response.headers.get("Location")
-            group_id = location_url.split("/")[-1]
-
-            # 2. Set description attribute (Optional)
-            if group_data.description:
-                # Keycloak PUT is used to update details including attributes
-                await client.put(
-                    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
-                    headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"},
-                    json={"attributes": {"description": [group_data.description]}},
-                    timeout=5.0
-                )
-            
-            return {"message": f"Group '{group_data.name}' created successfully.", "group_id": group_id}
-            
+        
+        location_url = create_response.headers.get("Location")
+        group_id = location_url.split("/")[-1]
+
+        # 2. Set description attribute (Optional)
+        if group_data.description:
+            # Keycloak PUT is used to update details including attributes
+            await client.put(
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
+                headers={"Content-Type": "application/json"},
+                auth=admin_auth,
+                json={"attributes": {"description": [group_data.description]}}
+            )
+        
+        directory.upsert_group({
+            "id": group_id,
+            "name": group_data.name,
+            "path": f"/{group_data.name}",
+            "attributes": {"description": [group_data.description]} if group_data.description else {}
+        })
+        return {"message": f"Group '{group_data.name}' created successfully.", "group_id": group_id}
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -764,8 +1698,6 @@ async def update_group(
     Updates an existing group's name and/or description (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
         update_payload = {
             "name": group_data.name,
             "attributes": {
@@ -773,29 +1705,27 @@ async def update_group(
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.put(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json=update_payload,
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json=update_payload
+        )
+        
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Group not found.")
+        if response.status_code == 409:
+            raise HTTPException(status_code=409, detail=f"Group with name '{group_data.name}' already exists.")
             
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Group not found.")
-            if response.status_code == 409:
-                raise HTTPException(status_code=409, detail=f"Group with name '{group_data.name}' already exists.")
-                
-            if response.status_code not in [204, 200]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to update group in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
+        if response.status_code not in [204, 200]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to update group in Keycloak. HTTP {response.status_code}: {response.text}"
+            )
 
-            return {"message": f"Group '{group_data.name}' updated successfully."}
+        directory.update_group(group_id, update_payload)
+        return {"message": f"Group '{group_data.name}' updated successfully."}
 
     except HTTPException:
         raise
@@ -809,31 +1739,29 @@ async def update_group(
 @app.delete("/admin/groups/{group_id}")
 async def delete_group(
     group_id: str,
-    current_user: dict = Depends(verify_admin_role)
+    current_user: dict = Depends(verify_admin_role_with_revocation)
 ):
     """
     Deletes a group from Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
-                headers={"Authorization": f"Bearer {admin_token}"},
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.delete(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}",
+            auth=admin_auth
+        )
 
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Group not found.")
-                
-            if response.status_code not in [204]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to delete group in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Group not found.")
+            
+        if response.status_code not in [204]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete group in Keycloak. HTTP {response.status_code}: {response.text}"
+            )
 
-            return {"message": f"Group {group_id} deleted successfully."}
+        directory.remove_group(group_id)
+        return {"message": f"Group {group_id} deleted successfully."}
 
     except HTTPException:
         raise
@@ -852,10 +1780,8 @@ async def get_group_members(
     """
     Gets members of a specific group (Admin only).
     """
-    admin_token = await get_admin_token()
-    
     members_data = await fetch_keycloak_data(
-        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}/members", admin_token
+        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}/members"
     )
     
     return [
@@ -863,6 +1789,31 @@ async def get_group_members(
         for member in members_data
     ]
 
+async def resolve_user_id(username: str, use_directory: bool) -> Optional[str]:
+    """
+    Maps a username to a user id via the directory mirror, the shared username
+    cache, or an exact-match Keycloak lookup, in that order. None if no such user.
+    """
+    if use_directory:
+        user_id = directory.find_user_id(username)
+        if user_id is not None:
+            return user_id
+
+    user_id = username_cache.get(username)
+    if user_id is not None:
+        return user_id
+
+    users = await fetch_keycloak_data(
+        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users",
+        params={"username": username, "exact": "true", "briefRepresentation": "true"}
+    )
+    # exact=true is honoured by Keycloak 22+; still guard against older servers' fuzzy matches
+    match = next((u for u in users if u.get("username", "").lower() == username.lower()), None)
+    if match is None:
+        return None
+    username_cache.put(username, match["id"])
+    return match["id"]
+
 @app.post("/admin/groups/{group_id}/members")
 async def add_members_to_group(
     group_id: str,
@@ -871,116 +1822,141 @@ async def add_members_to_group(
 ):
     """
     Adds multiple users to a group. Requires member_usernames list (Admin only).
+
+    Usernames are resolved and added KEYCLOAK_FANOUT_CONCURRENCY at a time. The
+    response lists which usernames were `added`, `missing` (no such user) or
+    `failed` (with the error).
     """
-    admin_token = await get_admin_token()
-    
-    async with httpx.AsyncClient() as client:
-        success_count = 0
-        for username in members_data.member_usernames:
-            try:
-                # 1. Find the user ID by username
-                users = await fetch_keycloak_data(
-                    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users?username={username}", 
-                    admin_token
-                )
-                if not users:
-                    print(f"Warning: User {username} not found.")
-                    continue
-                
-                user_id = users[0]["id"]
-                
-                # 2. Add user to the group
-                response = await client.put(
-                    f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups/{group_id}",
-                    headers={"Authorization": f"Bearer {admin_token}"},
-                    timeout=5.0
-                )
-                
-                if response.status_code in [204, 200]:
-                    success_count += 1
-                else:
-                    print(f"Warning: Failed to add user {username} to group. HTTP {response.status_code}")
+    client = get_client()
+    use_directory = await directory_ready()
+    # Keep the caller's order, without duplicates
+    usernames = list(dict.fromkeys(members_data.member_usernames))
+
+    async def add_member(username: str) -> Dict[str, Any]:
+        try:
+            # 1. Find the user ID by username
+            user_id = await resolve_user_id(username, use_directory)
+            if user_id is None:
+                return {"username": username, "status": "missing"}
+
+            # 2. Add user to the group
+            response = await client.put(
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/users/{user_id}/groups/{group_id}",
+                auth=admin_auth
+            )
 
-            except HTTPException as e:
-                print(f"Error adding user {username}: {e.detail}")
-            except Exception as e:
-                print(f"Unexpected error adding user {username}: {str(e)}")
-                
-    if success_count == 0:
-        raise HTTPException(status_code=400, detail="Failed to add any members. Check usernames or Keycloak connection.")
+            if response.status_code in [204, 200]:
+                directory.add_group_member(group_id, user_id)
+                return {"username": username, "status": "added", "id": user_id}
+            if response.status_code == 404:
+                # Stale cache entry: the user was deleted since we looked it up
+                username_cache.forget_user(user_id)
+            return {"username": username, "status": "failed", "error": f"HTTP {response.status_code}"}
+
+        except HTTPException as e:
+            return {"username": username, "status": "failed", "error": e.detail}
+        except httpx.HTTPError as e:
+            return {"username": username, "status": "failed", "error": str(e) or type(e).__name__}
+
+    outcomes = await map_concurrently(add_member, usernames)
+    result = {
+        "added": [o["username"] for o in outcomes if o["status"] == "added"],
+        "missing": [o["username"] for o in outcomes if o["status"] == "missing"],
+        "failed": [{"username": o["username"], "error": o["error"]} for o in outcomes if o["status"] == "failed"],
+    }
+
+    if not result["added"]:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": "Failed to add any members. Check usernames or Keycloak connection.", **result}
+        )
 
-    return {"message": f"Successfully added {success_count} member(s) to group {group_id}."}
+    return {"message": f"Successfully added {len(result['added'])} member(s) to group {group_id}.", **result}
 
 
 # --- ROLE MANAGEMENT ENDPOINTS ---
 
+def role_users_url(role: Dict[str, Any]) -> str:
+    """Admin API URL listing the users of a realm role, or of a client role via its client."""
+    role_name = quote(role["name"], safe="")
+    if role.get("clientRole"):
+        return f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/clients/{role['containerId']}/roles/{role_name}/users"
+    return f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{role_name}/users"
+
+async def fetch_client_roles(c: Dict[str, Any]) -> List[Dict[str, Any]]:
+    try:
+        client_roles = await fetch_keycloak_data(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/clients/{c['id']}/roles"
+        )
+    except HTTPException as e:
+        # It's possible some clients don't have roles or we can't access them
+        print(f"Could not fetch roles for client {c.get('clientId')}: {e.detail}")
+        return []
+
+    for role in client_roles:
+        role.setdefault("clientRole", True)
+        role.setdefault("containerId", c["id"])
+    return client_roles
+
+def format_role_row(role: Dict[str, Any], user_count: int) -> Dict[str, Any]:
+    return {
+        "id": role["id"],
+        "name": role["name"],
+        "description": role.get("description", "No description provided"),
+        "composite": role.get("composite", False),
+        "usersCount": user_count,
+        "status": True 
+    }
+
+async def format_role(role: Dict[str, Any]) -> Dict[str, Any]:
+    return format_role_row(role, await count_keycloak_items(role_users_url(role)))
+
 @app.get("/admin/roles", response_model=List[Dict[str, Any]])
 async def get_all_realm_roles(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(verify_admin_role)
 ) -> List[Dict[str, Any]]:
     """
     Gets all available realm and client roles from Keycloak with details and user count (Admin only).
     """
-    try:
-        admin_token = await get_admin_token()
-        
-        # 1. Fetch Realm Roles
-        realm_roles = await fetch_keycloak_data(
-            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles", admin_token
+    if await directory_ready():
+        etag = version_etag("roles", directory.generation)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        cached = snapshot_response(request, response_snapshots, etag, etag_headers(etag))
+        if cached is not None:
+            return cached
+        set_etag(response, etag)
+        return fast_json_response(
+            request,
+            [
+                format_role_row(role, directory.role_user_count(role["id"]))
+                for role in directory.list_roles()
+                if not role["name"].startswith("default-roles-")
+            ],
+            etag_headers(etag),
+            response_snapshots,
+            etag
         )
-        
-        # 2. Fetch Clients to get Client Roles
-        clients = await fetch_keycloak_data(
-            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/clients", admin_token
+
+    try:
+        # 1. Fetch Realm Roles, and 2. Clients to get Client Roles
+        realm_roles, clients = await asyncio.gather(
+            fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles"),
+            fetch_keycloak_data(f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/clients"),
         )
         
+        # 3. Fetch roles for each client concurrently and add to the list
         all_roles = list(realm_roles)
-        
-        # 3. Fetch roles for each client and add to the list
-        async with httpx.AsyncClient() as client:
-            for c in clients:
-                client_id = c['id']
-                client_roles_url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/clients/{client_id}/roles"
-                
-                try:
-                    client_roles = await fetch_keycloak_data(client_roles_url, admin_token)
-                    all_roles.extend(client_roles)
-                except HTTPException as e:
-                    # It's possible some clients don't have roles or we can't access them
-                    print(f"Could not fetch roles for client {c.get('clientId')}: {e.detail}")
-
-        # 4. Format all roles
-        formatted_roles = []
-        async with httpx.AsyncClient() as client:
-            for role in all_roles:
-                role_name_encoded = httpx.URL(role['name']).path.strip('/') # URL encode role name
-                
-                # Fetch user count for the role
-                users_url = f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{role_name_encoded}/users"
-                user_count_response = await client.get(
-                    users_url,
-                    headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"},
-                    timeout=5.0
-                )
-                
-                user_count = 0
-                if user_count_response.status_code == 200:
-                    user_count = len(user_count_response.json())
-                
-                # Exclude default realm roles if they are not needed
-                if role['name'].startswith('default-roles-'):
-                    continue
-
-                formatted_roles.append({
-                    "id": role["id"],
-                    "name": role["name"],
-                    "description": role.get("description", "No description provided"),
-                    "composite": role.get("composite", False),
-                    "usersCount": user_count,
-                    "status": True 
-                })
-                
-        return formatted_roles
+        for client_roles in await map_concurrently(fetch_client_roles, clients):
+            all_roles.extend(client_roles)
+
+        # Exclude default realm roles before spending any requests on them
+        all_roles = [role for role in all_roles if not role['name'].startswith('default-roles-')]
+
+        # 4. Format all roles, counting users with paged brief queries
+        return fast_json_response(request, await map_concurrently(format_role, all_roles))
         
     except HTTPException:
         raise
@@ -1000,30 +1976,35 @@ async def create_realm_role(
     Creates a new realm role in Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json={"name": role_data.name, "description": role_data.description}
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json={"name": role_data.name, "description": role_data.description},
-                timeout=10.0
+        if response.status_code == 409:
+            raise HTTPException(status_code=409, detail="Role with this name already exists.")
+        
+        if response.status_code != 201:
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Failed to create role in Keycloak. HTTP {response.status_code}: {response.text}"
             )
-            
-            if response.status_code == 409:
-                raise HTTPException(status_code=409, detail="Role with this name already exists.")
-            
-            if response.status_code != 201:
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Failed to create role in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
-            
-            return {"message": f"Role '{role_data.name}' created successfully."}
-            
+        
+        # Keycloak doesn't return the new role's id, which the mirror is keyed by
+        role_response = await client.get(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{quote(role_data.name, safe='')}",
+            auth=admin_auth
+        )
+        if role_response.status_code == 200:
+            directory.upsert_role(role_response.json())
+        else:
+            directory.mark_stale()
+
+        return {"message": f"Role '{role_data.name}' created successfully."}
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -1043,50 +2024,48 @@ async def update_realm_role(
     Updates an existing realm role's name and/or description (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        # 1. Fetch existing role details (needed to get the ID and other metadata)
+        get_response = await client.get(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{current_role_name}",
+            auth=admin_auth
+        )
+        if get_response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Role not found.")
+        if get_response.status_code != 200:
+             raise HTTPException(status_code=500, detail="Failed to fetch role before update.")
+             
+        existing_role = get_response.json()
         
-        async with httpx.AsyncClient() as client:
-            # 1. Fetch existing role details (needed to get the ID and other metadata)
-            get_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{current_role_name}",
-                headers={"Authorization": f"Bearer {admin_token}"},
-                timeout=5.0
-            )
-            if get_response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Role not found.")
-            if get_response.status_code != 200:
-                 raise HTTPException(status_code=500, detail="Failed to fetch role before update.")
-                 
-            existing_role = get_response.json()
-            
-            # 2. Merge data for PUT payload
-            updated_payload = {
-                **existing_role,
-                "name": role_data.name, # New name
-                "description": role_data.description or existing_role.get("description", "")
-            }
+        # 2. Merge data for PUT payload
+        updated_payload = {
+            **existing_role,
+            "name": role_data.name, # New name
+            "description": role_data.description or existing_role.get("description", "")
+        }
 
-            # 3. Send the PUT request to Keycloak using the existing name in the path
-            response = await client.put(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{current_role_name}",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json=updated_payload,
-                timeout=10.0
-            )
+        # 3. Send the PUT request to Keycloak using the existing name in the path
+        response = await client.put(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{current_role_name}",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json=updated_payload
+        )
 
-            if response.status_code == 409:
-                raise HTTPException(status_code=409, detail=f"Role with new name '{role_data.name}' already exists.")
-                
-            if response.status_code not in [204, 200]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to update role in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
+        if response.status_code == 409:
+            raise HTTPException(status_code=409, detail=f"Role with new name '{role_data.name}' already exists.")
+            
+        if response.status_code not in [204, 200]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to update role in Keycloak. HTTP {response.status_code}: {response.text}"
+            )
 
-            return {"message": f"Role '{current_role_name}' updated to '{role_data.name}' successfully."}
+        directory.update_realm_role(current_role_name, {
+            "name": updated_payload["name"],
+            "description": updated_payload["description"]
+        })
+        return {"message": f"Role '{current_role_name}' updated to '{role_data.name}' successfully."}
 
     except HTTPException:
         raise
@@ -1100,31 +2079,29 @@ async def update_realm_role(
 @app.delete("/admin/roles/{role_name}")
 async def delete_realm_role(
     role_name: str,
-    current_user: dict = Depends(verify_admin_role)
+    current_user: dict = Depends(verify_admin_role_with_revocation)
 ):
     """
     Deletes a realm role from Keycloak (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.delete(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{role_name}",
-                headers={"Authorization": f"Bearer {admin_token}"},
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.delete(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{role_name}",
+            auth=admin_auth
+        )
 
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Role not found.")
-                
-            if response.status_code not in [204]:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to delete role in Keycloak. HTTP {response.status_code}: {response.text}"
-                )
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Role not found.")
+            
+        if response.status_code not in [204]:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to delete role in Keycloak. HTTP {response.status_code}: {response.text}"
+            )
 
-            return {"message": f"Role {role_name} deleted successfully."}
+        directory.remove_realm_role(role_name)
+        return {"message": f"Role {role_name} deleted successfully."}
 
     except HTTPException:
         raise
@@ -1135,6 +2112,24 @@ async def delete_realm_role(
         )
 
 
+async def resolve_realm_role(role_name: str) -> Optional[Dict[str, Any]]:
+    """The realm role's representation, from the mirror when possible. None if it doesn't exist."""
+    if await directory_ready():
+        role = directory.find_realm_role(role_name)
+        if role is not None:
+            return role
+
+    response = await get_client().get(
+        f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{quote(role_name, safe='')}",
+        headers={"Content-Type": "application/json"},
+        auth=admin_auth
+    )
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch role details: {response.text}")
+    return response.json()
+
 @app.post("/admin/groups/{group_id}/roles/assign")
 async def assign_role_to_group(
     group_id: str,
@@ -1145,50 +2140,36 @@ async def assign_role_to_group(
     Assigns a realm role to a specific group (Admin only).
     """
     try:
-        admin_token = await get_admin_token()
+        client = get_client()
+        # 1. Get the Role details (need the ID and name for the payload)
+        role_details = await resolve_realm_role(role_name)
+        if role_details is None:
+            raise HTTPException(status_code=404, detail=f"Role '{role_name}' not found.")
         
-        async with httpx.AsyncClient() as client:
-            # 1. Get the Role details (need the ID and name for the payload)
-            role_response = await client.get(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/roles/{role_name}",
-                headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/json"},
-                timeout=5.0
-            )
-            
-            if role_response.status_code == 404:
-                raise HTTPException(status_code=404, detail=f"Role '{role_name}' not found.")
-            if role_response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Failed to fetch role details: {role_response.text}")
+        # Keycloak uses a list containing the role object for assignment
+        payload = [
+            {
+                "id": role_details["id"],
+                "name": role_details["name"]
+            }
+        ]
+
+        # 2. Assign the role to the group
+        assign_response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}/role-mappings/realm",
+            headers={"Content-Type": "application/json"},
+            auth=admin_auth,
+            json=payload
+        )
 
-            role_details = role_response.json()
-            
-            # Keycloak uses a list containing the role object for assignment
-            payload = [
-                {
-                    "id": role_details["id"],
-                    "name": role_details["name"]
-                }
-            ]
-
-            # 2. Assign the role to the group
-            assign_response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/groups/{group_id}/role-mappings/realm",
-                headers={
-                    "Authorization": f"Bearer {admin_token}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=10.0
+        if assign_response.status_code in [204]:
+            return {"message": f"Role '{role_name}' assigned to group {group_id} successfully."}
+        else:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to assign role. HTTP {assign_response.status_code}: {assign_response.text}"
             )
 
-            if assign_response.status_code in [204]:
-                return {"message": f"Role '{role_name}' assigned to group {group_id} successfully."}
-            else:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to assign role. HTTP {assign_response.status_code}: {assign_response.text}"
-                )
-
     except HTTPException:
         raise
     except Exception as e:
@@ -1197,6 +2178,77 @@ async def assign_role_to_group(
             detail=f"An unexpected error occurred during role assignment: {str(e)}"
         )
 
+async def apply_bulk_role_mapping(mapping: BulkRoleMapping, assign: bool) -> Dict[str, Any]:
+    """
+    Adds or removes the realm roles in `mapping` on every target group and user.
+    Each role is resolved once; each target gets a single request carrying all
+    roles, KEYCLOAK_FANOUT_CONCURRENCY targets at a time.
+    """
+    role_names = list(dict.fromkeys(mapping.roles))
+    resolved = await map_concurrently(resolve_realm_role, role_names)
+    roles = [role for role in resolved if role is not None]
+    unknown_roles = [name for name, role in zip(role_names, resolved) if role is None]
+    if not roles:
+        raise HTTPException(status_code=404, detail=f"Roles not found: {', '.join(unknown_roles)}")
+
+    payload = [{"id": role["id"], "name": role["name"]} for role in roles]
+    targets = [("group", group_id) for group_id in dict.fromkeys(mapping.group_ids)]
+    targets += [("user", user_id) for user_id in dict.fromkeys(mapping.user_ids)]
+    client = get_client()
+
+    async def apply(target) -> Dict[str, Any]:
+        target_type, target_id = target
+        outcome = {"type": target_type, "id": target_id}
+        try:
+            response = await client.request(
+                "POST" if assign else "DELETE",
+                f"{KEYCLOAK_SERVER_URL}/admin/realms/{KEYCLOAK_REALM}/{target_type}s/{target_id}/role-mappings/realm",
+                headers={"Content-Type": "application/json"},
+                auth=admin_auth,
+                json=payload
+            )
+        except httpx.HTTPError as e:
+            return {**outcome, "status": "failed", "error": str(e) or type(e).__name__}
+
+        if response.status_code in [200, 204]:
+            if target_type == "user":
+                directory.map_user_roles(target_id, [role["id"] for role in roles], mapped=assign)
+            return {**outcome, "status": "assigned" if assign else "unassigned"}
+        if response.status_code == 404:
+            return {**outcome, "status": "failed", "error": f"{target_type.capitalize()} not found"}
+        return {**outcome, "status": "failed", "error": f"HTTP {response.status_code}: {response.text}"}
+
+    results = await map_concurrently(apply, targets)
+    return {
+        "roles": [role["name"] for role in roles],
+        "unknownRoles": unknown_roles,
+        "succeeded": sum(1 for r in results if r["status"] != "failed"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "results": results,
+    }
+
+@app.post("/admin/roles/bulk-assign")
+async def bulk_assign_roles(
+    mapping: BulkRoleMapping,
+    current_user: dict = Depends(verify_admin_role_with_revocation)
+):
+    """
+    Assigns a set of realm roles to many groups and/or users in one call, with a
+    result per target (Admin only).
+    """
+    return await apply_bulk_role_mapping(mapping, assign=True)
+
+@app.post("/admin/roles/bulk-unassign")
+async def bulk_unassign_roles(
+    mapping: BulkRoleMapping,
+    current_user: dict = Depends(verify_admin_role_with_revocation)
+):
+    """
+    Removes a set of realm roles from many groups and/or users in one call, with
+    a result per target (Admin only).
+    """
+    return await apply_bulk_role_mapping(mapping, assign=False)
+
 # --- Custom Login Endpoint ---
 @app.post("/custom-login")
 async def custom_login(credentials: LoginCredentials):
@@ -1204,36 +2256,35 @@ async def custom_login(credentials: LoginCredentials):
     Authenticates a user against Keycloak using Resource Owner Password Credentials (ROPC) flow.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token",
-                data={
-                    "grant_type": "password",
-                    "client_id": KEYCLOAK_CLIENT_ID,
-                    "username": credentials.username,
-                    "password": credentials.password,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token",
+            data={
+                "grant_type": "password",
+                "client_id": KEYCLOAK_CLIENT_ID,
+                "username": credentials.username,
+                "password": credentials.password,
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
 
-            if response.status_code == 200:
-                token_data = response.json()
-                return {
-                    "access_token": token_data["access_token"],
-                    "refresh_token": token_data.get("refresh_token"),
-                    "expires_in": token_data["expires_in"],
-                    "token_type": token_data["token_type"],
-                }
+        if response.status_code == 200:
+            token_data = response.json()
+            return {
+                "access_token": token_data["access_token"],
+                "refresh_token": token_data.get("refresh_token"),
+                "expires_in": token_data["expires_in"],
+                "token_type": token_data["token_type"],
+            }
 
-            if response.status_code == 401:
-                error_detail = response.json().get("error_description", "Invalid credentials")
-                raise HTTPException(status_code=401, detail=error_detail)
+        if response.status_code == 401:
+            error_detail = response.json().get("error_description", "Invalid credentials")
+            raise HTTPException(status_code=401, detail=error_detail)
 
-            raise HTTPException(
-                status_code=500,
-                detail=f"Keycloak authentication failed: HTTP {response.status_code} {response.text}"
-            )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Keycloak authentication failed: HTTP {response.status_code} {response.text}"
+        )
 
     except httpx.RequestError as e:
         raise HTTPException(
@@ -1254,21 +2305,30 @@ async def custom_login(credentials: LoginCredentials):
 @app.get("/api/permissions")
 async def get_permissions_list(current_user: dict = Depends(verify_admin_role)):
     # In a real app, this might come from a config file or another DB table
-    return [
-        'Activate Graphmarts', 'Browse Dashboards', 'Browse Models', 'Create Dashboards',
-        'Create Graphmarts', 'Data On Demand', 'Manage Graphmarts', 'Manage Models',
-        'Show Query Builder', 'View Datasets', 'View Graphmarts', 'View Provenance',
-        'Create Anzo Data Stores', 'Create Data Sources'
-    ]
+    return PERMISSIONS
 
 @app.get("/api/role-permissions")
 async def get_all_role_permissions(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
     current_user: dict = Depends(verify_admin_role)
 ):
     """
     Gets the complete permission matrix from the database.
     """
+    version = await db_executor.run_session(get_data_version, "role_permissions")
+    etag = version_etag("role_permissions", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    cached = snapshot_response(request, response_snapshots, etag, etag_headers(etag))
+    if cached is not None:
+        return cached
+    set_etag(response, etag)
+
+    permission_matrix = await db_executor.run_session(load_permission_matrix)
+    return fast_json_response(request, permission_matrix, etag_headers(etag), response_snapshots, etag)
+
+def load_permission_matrix(db: Session) -> Dict[str, Dict[str, bool]]:
     all_permissions = db.query(RolePermission).all()
     
     # Format the data into the nested dictionary structure the frontend expects
@@ -1277,37 +2337,94 @@ async def get_all_role_permissions(
         if p.role_name not in permission_matrix:
             permission_matrix[p.role_name] = {}
         permission_matrix[p.role_name][p.permission_name] = p.enabled == 'true'
-        
     return permission_matrix
 
+def apply_permission_changes(db: Session, cells: Dict[tuple, bool], replace: bool) -> Dict[str, int]:
+    """
+    Writes `(role, permission) -> enabled` cells in one transaction, touching
+    only cells whose value actually changes: new and changed cells are written
+    with one upsert on the unique (role, permission) index, so a concurrent
+    writer can't leave a duplicate row. With `replace`, rows for cells not in
+    `cells` are deleted (full matrix replace); otherwise they are left alone.
+    """
+    query = db.query(RolePermission.id, RolePermission.role_name, RolePermission.permission_name, RolePermission.enabled)
+    if not replace:
+        query = query.filter(RolePermission.role_name.in_({role for role, _ in cells}))
+    existing = {(role_name, permission_name): (row_id, enabled) for row_id, role_name, permission_name, enabled in query}
+
+    deletes = [row_id for cell, (row_id, _) in existing.items() if replace and cell not in cells]
+    writes = [
+        {"role_name": role_name, "permission_name": permission_name, "enabled": str(enabled).lower()}
+        for (role_name, permission_name), enabled in cells.items()
+        if existing.get((role_name, permission_name), (None, None))[1] != str(enabled).lower()
+    ]
+    inserted = sum(1 for row in writes if (row["role_name"], row["permission_name"]) not in existing)
+
+    try:
+        if writes:
+            dialect_insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+            upsert = dialect_insert(RolePermission)
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[RolePermission.role_name, RolePermission.permission_name],
+                set_={"enabled": upsert.excluded.enabled},
+            )
+            db.execute(upsert, writes)
+        if deletes:
+            db.execute(delete(RolePermission).where(RolePermission.id.in_(deletes)))
+        if writes or deletes:
+            bump_data_version(db, "role_permissions")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    permission_index.invalidate()
+
+    return {
+        "inserted": inserted,
+        "updated": len(writes) - inserted,
+        "deleted": len(deletes),
+        "unchanged": sum(1 for cell in cells if cell in existing) - (len(writes) - inserted),
+    }
+
 @app.post("/api/role-permissions")
 async def update_role_permissions(
     update_data: RolePermissionsUpdate,
-    db: Session = Depends(get_db),
     current_user: dict = Depends(verify_admin_role)
 ):
     """
     Receives a complete permission matrix and updates the database.
+    Only the cells that differ from what is stored are written.
     """
+    cells = {
+        (role_name, permission_name): enabled
+        for role_name, permissions in update_data.permissions.items()
+        for permission_name, enabled in permissions.items()
+    }
     try:
-        # Clear existing permissions to do a full replace
-        db.query(RolePermission).delete()
-        
-        # Insert the new permissions
-        for role_name, permissions in update_data.permissions.items():
-            for permission_name, enabled in permissions.items():
-                new_permission = RolePermission(
-                    role_name=role_name,
-                    permission_name=permission_name,
-                    enabled=str(enabled).lower()
-                )
-                db.add(new_permission)
-        
-        db.commit()
-        return {"message": "Permissions updated successfully."}
-        
+        changes = await db_executor.run_session(apply_permission_changes, cells, True)
+        return {"message": "Permissions updated successfully.", **changes}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred while updating permissions: {str(e)}"
+        )
+
+@app.patch("/api/role-permissions")
+async def patch_role_permissions(
+    changes: List[RolePermissionData],
+    current_user: dict = Depends(verify_admin_role)
+):
+    """
+    Applies only the changed `(role, permission, enabled)` cells, in one transaction.
+    """
+    # Last write wins if the same cell appears twice
+    cells = {(change.role, change.permission): change.enabled for change in changes}
+    try:
+        result = await db_executor.run_session(apply_permission_changes, cells, False)
+        return {"message": "Permissions updated successfully.", **result}
+
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while updating permissions: {str(e)}"
@@ -1323,29 +2440,28 @@ async def refresh_token(token: RefreshToken):
     Refreshes an access token using a refresh token.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token",
-                data={
-                    "grant_type": "refresh_token",
-                    "client_id": KEYCLOAK_CLIENT_ID,
-                    "refresh_token": token.refresh_token,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=10.0
-            )
+        client = get_client()
+        response = await client.post(
+            f"{KEYCLOAK_SERVER_URL}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token",
+            data={
+                "grant_type": "refresh_token",
+                "client_id": KEYCLOAK_CLIENT_ID,
+                "refresh_token": token.refresh_token,
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
 
-            if response.status_code == 200:
-                return response.json()
-            
-            if response.status_code in [400, 401]:
-                error_detail = response.json().get("error_description", "Invalid refresh token")
-                raise HTTPException(status_code=401, detail=error_detail)
+        if response.status_code == 200:
+            return response.json()
+        
+        if response.status_code in [400, 401]:
+            error_detail = response.json().get("error_description", "Invalid refresh token")
+            raise HTTPException(status_code=401, detail=error_detail)
 
-            raise HTTPException(
-                status_code=500,
-                detail=f"Keycloak token refresh failed: HTTP {response.status_code} {response.text}"
-            )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Keycloak token refresh failed: HTTP {response.status_code} {response.text}"
+        )
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=500,
@@ -1355,37 +2471,93 @@ async def refresh_token(token: RefreshToken):
 
 # --- Language Model Endpoints ---
 
+# Listing pages per user, so repeat reads skip the database
+visible_models_cache = VisibleModelsCache(
+    max_users=int(os.getenv("MODEL_CACHE_USERS", "1000")),
+    ttl=float(os.getenv("MODEL_CACHE_TTL", "30")),
+)
+
+def language_model_dict(model: LanguageModel) -> Dict[str, Any]:
+    """The same fields FastAPI would emit for the ORM object."""
+    return {column.name: getattr(model, column.name) for column in LanguageModel.__table__.columns}
+
+def visible_models_query(db: Session, username: str):
+    """
+    Models `username` may see, in one statement: their own models, or all
+    public models if they have created none.
+    """
+    own = aliased(LanguageModel)
+    return db.query(LanguageModel).filter(or_(
+        LanguageModel.created_by == username,
+        and_(LanguageModel.is_public.is_(True), ~exists().where(own.created_by == username))
+    ))
+
+def insert_language_model(db: Session, model_data: LanguageModelCreate, username: str) -> Dict[str, Any]:
+    new_model = LanguageModel(
+        provider=model_data.provider,
+        model_name=model_data.model_name,
+        api_key=model_data.api_key,
+        api_url=model_data.api_url,
+        is_public=model_data.is_public,
+        created_by=username
+    )
+    try:
+        db.add(new_model)
+        bump_data_version(db, "language_models")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(new_model)
+    return language_model_dict(new_model)
+
+def load_visible_models_page(
+    db: Session,
+    username: str,
+    provider: Optional[str],
+    model_name: Optional[str],
+    after: int,
+    limit: int
+):
+    """Returns `(models, next_after)`; `next_after` is None on the last page."""
+    query = visible_models_query(db, username).filter(LanguageModel.id > after)
+    if provider is not None:
+        query = query.filter(LanguageModel.provider == provider)
+    if model_name is not None:
+        query = query.filter(LanguageModel.model_name == model_name)
+    # One extra row tells whether there is a next page
+    rows = query.order_by(LanguageModel.id).limit(limit + 1).all()
+    models = [language_model_dict(m) for m in rows[:limit]]
+    next_after = models[-1]["id"] if len(rows) > limit else None
+    return models, next_after
+
 @app.post("/api/models")
 async def create_language_model(
     model_data: LanguageModelCreate,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(verify_admin_role)
+    current_user: dict = Depends(require_permission("Manage Models"))
 ):
     """
-    Creates a new language model entry in the database.
+    Creates a new language model entry in the database. `api_url` must pass
+    validate_model_url (https, and a public or allowlisted host).
     """
+    try:
+        await run_in_threadpool(validate_model_url, model_data.api_url)
+    except ModelURLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid api_url: {e}")
+
     try:
         username = current_user.get("preferred_username")
-        new_model = LanguageModel(
-            provider=model_data.provider,
-            model_name=model_data.model_name,
-            api_key=model_data.api_key,
-            api_url=model_data.api_url,
-            is_public=str(model_data.is_public).lower(),
-            created_by=username
-        )
-        db.add(new_model)
-        db.commit()
-        db.refresh(new_model)
+        new_model = await db_executor.run_session(insert_language_model, model_data, username)
+        # A public model shows up for everyone without models of their own
+        visible_models_cache.invalidate(None if model_data.is_public else username)
+        model_prober.wake()
         return new_model
     except StatementError as e:
-        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Database statement error: {e.orig}"
         )
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -1393,21 +2565,196 @@ async def create_language_model(
 
 @app.get("/api/models")
 async def get_language_models(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(verify_admin_role)
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    provider: Optional[str] = None,
+    model_name: Optional[str] = None,
+    current_user: dict = Depends(require_permission("Browse Models"))
 ):
     """
     Gets language models. If the user has created models, it returns those.
     Otherwise, it returns all public models.
+
+    Results are ordered by id and paged: up to `limit` (default
+    DEFAULT_PAGE_SIZE) per page, with the X-Next-Cursor header set when more
+    remain. `provider` and `model_name` filter on exact values. Each model
+    carries its latest probe `health` status; latency and error figures are
+    at /api/models/{id}/health, so the listing's ETag only moves when a
+    model goes up or down.
     """
     username = current_user.get("preferred_username")
-    user_models = db.query(LanguageModel).filter(LanguageModel.created_by == username).all()
-    
-    if user_models:
-        return user_models
+    after = 0
+    if cursor:
+        # The cursor carries the query it was issued for
+        state = decode_cursor(cursor)
+        after = cursor_int(state, "after", 0)
+        limit = cursor_int(state, "limit", DEFAULT_PAGE_SIZE, minimum=1)
+        provider, model_name = cursor_field(state, "provider", str), cursor_field(state, "model_name", str)
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    query = (provider, model_name, after, limit)
+
+    # The version lookup is a primary-key read; the page query only runs if the tag doesn't match
+    version = await db_executor.run_session(get_data_version, "language_models")
+    etag = version_etag("language_models", version, model_prober.generation, username, *query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Cached pages are reused only while the version they were read at is current
+    page = visible_models_cache.get(username, query)
+    if page is None or page[0] != version:
+        models, next_after = await db_executor.run_session(load_visible_models_page, username, *query)
+        visible_models_cache.put(username, query, (version, models, next_after))
     else:
-        public_models = db.query(LanguageModel).filter(LanguageModel.is_public == "true").all()
-        return public_models
+        _, models, next_after = page
+
+    headers = etag_headers(etag)
+    if next_after is not None:
+        headers["X-Next-Cursor"] = encode_cursor(
+            {"after": next_after, "limit": limit, "provider": provider, "model_name": model_name}
+        )
+    cached = snapshot_response(request, response_snapshots, etag, headers)
+    if cached is not None:
+        return cached
+    response.headers.update(headers)
+    models = [{**model, "health": {"status": model_prober.status(model["id"])}} for model in models]
+    return fast_json_response(request, models, headers, response_snapshots, etag)
+
+# --- Model Invocation Proxy ---
+
+# Pooled clients for calls to registered models, one per provider host
+provider_clients = ProviderClients()
+
+def load_invokable_model(db: Session, model_id: int, username: str) -> Optional[Dict[str, Any]]:
+    """The model if `username` created it or it is public, else None."""
+    model = db.query(LanguageModel).filter(
+        LanguageModel.id == model_id,
+        or_(LanguageModel.created_by == username, LanguageModel.is_public.is_(True))
+    ).first()
+    return language_model_dict(model) if model else None
+
+@app.post("/api/models/{model_id}/invoke")
+async def invoke_language_model(
+    model_id: int,
+    request: Request,
+    current_user: dict = Depends(require_permission("Browse Models"))
+):
+    """
+    Forwards the request body (and query string) to the model's `api_url` with
+    the model's API key, and streams the provider's response back as it
+    arrives, so server-sent events and chunked output pass through unbuffered.
+    Only the model's creator may invoke a private model.
+    """
+    username = current_user.get("preferred_username")
+    model = await db_executor.run_session(load_invokable_model, model_id, username)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found.")
+
+    # Re-checked on every call: rows may predate validation, and DNS can change.
+    # The request goes to the address that was checked, not a fresh lookup
+    try:
+        target = await run_in_threadpool(pin_model_url, model["api_url"])
+        client = provider_clients.get(model["api_url"])
+    except ModelURLError as e:
+        raise HTTPException(status_code=502, detail=f"Model {model_id} has an unusable api_url: {e}")
+    upstream_request = client.build_request(
+        "POST",
+        target.url,
+        params=request.query_params,
+        headers={
+            **forwarded_request_headers(request.headers),
+            **auth_headers(model["provider"], model["api_key"]),
+            **target.headers,
+        },
+        content=request.stream(),
+        extensions=target.extensions,
+    )
+    try:
+        upstream = await client.send(upstream_request, stream=True)
+    except httpx.TimeoutException as e:
+        raise HTTPException(status_code=504, detail=f"Model provider timed out: {e}")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Error connecting to model provider: {e}")
+
+    # Raw bytes, so a compressed body passes through with its Content-Encoding intact
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=forwarded_response_headers(upstream.headers),
+        background=BackgroundTask(upstream.aclose),
+    )
+
+# --- Model Health Probing ---
+
+def load_probe_targets(db: Session) -> List[Dict[str, Any]]:
+    rows = db.query(
+        LanguageModel.id, LanguageModel.provider, LanguageModel.model_name, LanguageModel.api_url, LanguageModel.api_key
+    ).all()
+    return [row._asdict() for row in rows]
+
+async def fetch_probe_targets() -> List[Dict[str, Any]]:
+    return await db_executor.run_session(load_probe_targets)
+
+MODEL_HEALTH_PROBE_ENABLED = os.getenv("MODEL_HEALTH_PROBE_ENABLED", "true").lower() == "true"
+
+# Rolling latency and error rate per model, probed through the invoke proxy's clients
+model_prober = ModelHealthProber(
+    fetch_probe_targets,
+    provider_clients,
+    interval=float(os.getenv("MODEL_HEALTH_PROBE_INTERVAL", "60")),
+    timeout=float(os.getenv("MODEL_HEALTH_PROBE_TIMEOUT", "10")),
+    concurrency=int(os.getenv("MODEL_HEALTH_PROBE_CONCURRENCY", "10")),
+    window=int(os.getenv("MODEL_HEALTH_WINDOW", "100")),
+)
+
+@app.on_event("startup")
+async def start_model_prober():
+    if MODEL_HEALTH_PROBE_ENABLED:
+        await model_prober.start()
+
+@app.on_event("shutdown")
+async def stop_model_clients():
+    await model_prober.stop()
+    await provider_clients.stop()
+
+# Registered last, after every shutdown hook that still works through it
+@app.on_event("shutdown")
+def stop_db_executor():
+    db_executor.shutdown()
+
+@app.get("/api/models/health")
+async def get_models_health(current_user: dict = Depends(verify_admin_role)):
+    """
+    Probe results for every registered model: status, error rate and latency
+    percentiles over the last MODEL_HEALTH_WINDOW probes (Admin only).
+    """
+    targets = await fetch_probe_targets()
+    return {
+        "prober": model_prober.stats(),
+        "models": [
+            {
+                "id": target["id"],
+                "provider": target["provider"],
+                "model_name": target["model_name"],
+                "api_url": target["api_url"],
+                "health": model_prober.health(target["id"]),
+            }
+            for target in targets
+        ],
+    }
+
+@app.get("/api/models/{model_id}/health")
+async def get_model_health(
+    model_id: int,
+    current_user: dict = Depends(require_permission("Browse Models"))
+):
+    """Probe results for one model the caller can see."""
+    username = current_user.get("preferred_username")
+    model = await db_executor.run_session(load_invokable_model, model_id, username)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found.")
+    return {"id": model_id, "health": model_prober.health(model_id)}
 
 
 if __name__ == "__main__":
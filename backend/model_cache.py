@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class VisibleModelsCache:
+    """
+    Per-user LRU of language-model listing pages.
+
+    Each user's entry holds the pages they recently fetched, keyed by query
+    (filters, page size and position). Writes in this worker invalidate
+    directly: a public model clears everyone, a private one only its creator.
+    Writes in other workers are picked up once an entry is `ttl` seconds old.
+    """
+
+    def __init__(self, max_users: int = 1000, ttl: float = 30.0):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[Hashable, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str, query: Hashable) -> Optional[Any]:
+        entry = self._entries.get(username)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self._entries[username]
+            entry = None
+        if entry is None or query not in entry[1]:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1][query]
+
+    def put(self, username: str, query: Hashable, page: Any) -> None:
+        if self.max_users <= 0:
+            return
+        if username not in self._entries:
+            self._entries[username] = (time.monotonic(), {})
+        self._entries[username][1][query] = page
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        """Drops `username`'s pages, or everyone's if no username is given."""
+        if username is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(username, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._entries),
+            "max_users": self.max_users,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
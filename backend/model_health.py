@@ -0,0 +1,207 @@
+import asyncio
+import time
+import uuid
+from array import array
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from starlette.concurrency import run_in_threadpool
+
+from model_proxy import ModelURLError, ProviderClients, auth_headers, pin_model_url
+
+
+class LatencyRing:
+    """
+    Fixed-size ring of the last `size` probe results: latency in milliseconds
+    (a float array) and whether the probe failed (a byte each).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.latencies = array("d", [0.0] * size)
+        self.failures = bytearray(size)
+        self.count = 0
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, latency_ms: float, error: Optional[str] = None) -> None:
+        slot = self.count % self.size
+        self.latencies[slot] = latency_ms
+        self.failures[slot] = 1 if error else 0
+        self.count += 1
+        self.last_checked = time.time()
+        # Only the newest probe's error; a success clears it
+        self.last_error = error
+
+    @property
+    def status(self) -> str:
+        if not self.count:
+            return "unknown"
+        return "down" if self.failures[(self.count - 1) % self.size] else "up"
+
+    def summary(self) -> Dict[str, Any]:
+        filled = min(self.count, self.size)
+        if not filled:
+            return {"status": "unknown", "samples": 0}
+        failures = sum(self.failures[:filled])
+        # Percentiles over successful probes only; a timeout's latency is just the timeout
+        ok = sorted(self.latencies[i] for i in range(filled) if not self.failures[i])
+
+        def percentile(p: float) -> Optional[float]:
+            if not ok:
+                return None
+            return round(ok[min(int(p * len(ok)), len(ok) - 1)], 1)
+
+        return {
+            "status": self.status,
+            "samples": filled,
+            "error_rate": round(failures / filled, 3),
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+        }
+
+
+class ModelHealthProber:
+    """
+    Probes every registered model's `api_url` each `interval` seconds, at most
+    `concurrency` at a time, and keeps the last `window` results per model.
+
+    A probe is a GET with the model's credentials through the same pooled
+    client the invoke proxy uses (counted as probe traffic, not invocations).
+    Any HTTP response below 500 (model APIs typically answer a GET with
+    404/405) counts as up; 5xx, connection errors, timeouts and URLs that fail
+    validate_model_url count as failures.
+    """
+
+    def __init__(
+        self,
+        load_targets: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        clients: ProviderClients,
+        interval: float = 60.0,
+        timeout: float = 10.0,
+        concurrency: int = 10,
+        window: int = 100,
+    ):
+        self.load_targets = load_targets
+        self.clients = clients
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.window = window
+
+        self._rings: Dict[int, LatencyRing] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.rounds = 0
+        # Bumped only when some model's up/down status flips, so cached listings
+        # that embed the status stay valid across uneventful rounds
+        self.status_changes = 0
+        self.epoch = uuid.uuid4().hex
+        self.round_errors = 0
+        self.last_round_seconds: Optional[float] = None
+
+    async def probe(self, target: Dict[str, Any]) -> None:
+        ring = self._rings.get(target["id"])
+        if ring is None:
+            ring = self._rings[target["id"]] = LatencyRing(self.window)
+        started = time.perf_counter()
+        error = None
+        try:
+            pinned = await run_in_threadpool(pin_model_url, target["api_url"])
+            response = await self.clients.get(target["api_url"], probe=True).get(
+                pinned.url,
+                headers={**auth_headers(target["provider"], target["api_key"]), **pinned.headers},
+                timeout=self.timeout,
+                extensions=pinned.extensions,
+            )
+            if response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+        except ModelURLError as e:
+            error = f"blocked: {e}"
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+        previous = ring.status
+        ring.record((time.perf_counter() - started) * 1000, error)
+        if ring.status != previous:
+            self.status_changes += 1
+
+    async def probe_all(self) -> int:
+        """Probes every model once; returns how many were probed."""
+        started = time.perf_counter()
+        targets = await self.load_targets()
+        live_ids = {target["id"] for target in targets}
+        for model_id in list(self._rings):
+            if model_id not in live_ids:
+                del self._rings[model_id]
+
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+
+        async def limited(target):
+            async with semaphore:
+                await self.probe(target)
+
+        await asyncio.gather(*(limited(target) for target in targets))
+        self.rounds += 1
+        self.last_round_seconds = round(time.perf_counter() - started, 3)
+        return len(targets)
+
+    @property
+    def generation(self) -> str:
+        """`status_changes` qualified by this instance's epoch, as it restarts at 0 in every worker."""
+        return f"{self.epoch}.{self.status_changes}"
+
+    def status(self, model_id: int) -> str:
+        ring = self._rings.get(model_id)
+        return ring.status if ring else "unknown"
+
+    def health(self, model_id: int) -> Dict[str, Any]:
+        ring = self._rings.get(model_id)
+        return ring.summary() if ring else {"status": "unknown", "samples": 0}
+
+    def wake(self) -> None:
+        """Starts the next round now instead of at the end of the interval (e.g. after a model is added)."""
+        self._wakeup.set()
+
+    # --- Lifecycle ---
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                self.round_errors += 1
+                print(f"Warning: Model health probe round failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": len(self._rings),
+            "rounds": self.rounds,
+            "status_changes": self.status_changes,
+            "round_errors": self.round_errors,
+            "last_round_seconds": self.last_round_seconds,
+            "interval": self.interval,
+        }
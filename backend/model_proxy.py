@@ -0,0 +1,196 @@
+import ipaddress
+import os
+import socket
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import httpx
+
+# Connection pool settings for each provider host's client
+MODEL_HTTP_MAX_CONNECTIONS = int(os.getenv("MODEL_HTTP_MAX_CONNECTIONS", "100"))
+MODEL_HTTP_MAX_KEEPALIVE = int(os.getenv("MODEL_HTTP_MAX_KEEPALIVE", "20"))
+MODEL_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("MODEL_HTTP_KEEPALIVE_EXPIRY", "60"))
+MODEL_HTTP_CONNECT_TIMEOUT = float(os.getenv("MODEL_HTTP_CONNECT_TIMEOUT", "5"))
+# Time allowed between chunks; generations can pause for a while between tokens
+MODEL_HTTP_READ_TIMEOUT = float(os.getenv("MODEL_HTTP_READ_TIMEOUT", "300"))
+
+# Where registered models may live. Without an allowlist, any public address is accepted
+MODEL_URL_SCHEMES = {s.strip().lower() for s in os.getenv("MODEL_URL_SCHEMES", "https").split(",") if s.strip()}
+MODEL_HOST_ALLOWLIST = [h.strip().lower() for h in os.getenv("MODEL_HOST_ALLOWLIST", "").split(",") if h.strip()]
+MODEL_ALLOW_PRIVATE_HOSTS = os.getenv("MODEL_ALLOW_PRIVATE_HOSTS", "false").lower() == "true"
+
+# How each provider expects its API key; anything else gets a bearer token
+PROVIDER_AUTH_HEADERS = {
+    "anthropic": "x-api-key",
+    "google": "x-goog-api-key",
+    "gemini": "x-goog-api-key",
+    "azure": "api-key",
+}
+
+# Connection-level headers that must not be forwarded by a proxy
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host", "content-length",
+}
+# Caller headers passed on to the model; their credentials are replaced by the model's key
+FORWARDED_REQUEST_HEADERS = {"content-type", "accept", "accept-encoding", "user-agent"}
+
+
+class ModelURLError(ValueError):
+    """A model api_url the backend refuses to call."""
+
+
+def _host_allowed(host: str) -> bool:
+    # "example.com" matches exactly; ".example.com" matches any subdomain
+    return any(
+        host == entry or (entry.startswith(".") and host.endswith(entry))
+        for entry in MODEL_HOST_ALLOWLIST
+    )
+
+
+def _resolve(host: str, port: int) -> List[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise ModelURLError(f"Cannot resolve host '{host}': {e}")
+    return [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+
+
+class PinnedURL(NamedTuple):
+    """Where to send a model request, plus the headers/extensions that keep it addressed to the original host."""
+    url: httpx.URL
+    headers: Dict[str, str]
+    extensions: Dict[str, Any]
+
+
+def _check_model_url(url: str) -> Tuple[httpx.URL, Optional[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]]:
+    try:
+        parsed = httpx.URL(url)
+    except (httpx.InvalidURL, TypeError) as e:
+        raise ModelURLError(f"Invalid URL: {e}")
+    if parsed.scheme not in MODEL_URL_SCHEMES:
+        raise ModelURLError(f"URL scheme must be one of: {', '.join(sorted(MODEL_URL_SCHEMES))}")
+    host = (parsed.host or "").lower()
+    if not host:
+        raise ModelURLError("URL has no host")
+    if MODEL_HOST_ALLOWLIST:
+        if not _host_allowed(host):
+            raise ModelURLError(f"Host '{host}' is not on the model host allowlist")
+        return parsed, None
+    if MODEL_ALLOW_PRIVATE_HOSTS:
+        return parsed, None
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    addresses = _resolve(host, port)
+    for address in addresses:
+        if not address.is_global:
+            raise ModelURLError(f"Host '{host}' resolves to a non-public address ({address})")
+    return parsed, addresses[0]
+
+
+def validate_model_url(url: str) -> httpx.URL:
+    """
+    Checks that `url` may be called on a model's behalf: an allowed scheme
+    (MODEL_URL_SCHEMES, https by default) and a host on MODEL_HOST_ALLOWLIST,
+    or, without an allowlist, one that only resolves to public addresses, so
+    models can't be pointed at Keycloak, metadata endpoints or other internal
+    services. Blocking (DNS); run it off the event loop. Raises ModelURLError.
+    """
+    return _check_model_url(url)[0]
+
+
+def pin_model_url(url: str) -> PinnedURL:
+    """
+    validate_model_url, returning the URL to actually connect to. When the host
+    was checked by resolving it, the URL points at the checked address, with the
+    original name kept in the Host header and as the TLS SNI/certificate name,
+    so a DNS answer that changes after the check (rebinding) is never used.
+    Blocking (DNS); run it off the event loop. Raises ModelURLError.
+    """
+    parsed, address = _check_model_url(url)
+    try:
+        ipaddress.ip_address(parsed.host)
+        literal = True
+    except ValueError:
+        literal = False
+    if address is None or literal:
+        return PinnedURL(parsed, {}, {})
+    host_header = parsed.host if parsed.port is None else f"{parsed.host}:{parsed.port}"
+    return PinnedURL(
+        parsed.copy_with(host=str(address)),
+        {"Host": host_header},
+        {"sni_hostname": parsed.host},
+    )
+
+
+def auth_headers(provider: str, api_key: str) -> Dict[str, str]:
+    header = PROVIDER_AUTH_HEADERS.get((provider or "").lower())
+    if header is None:
+        return {"Authorization": f"Bearer {api_key}"}
+    return {header: api_key}
+
+
+def forwarded_request_headers(headers: httpx.Headers) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() in FORWARDED_REQUEST_HEADERS}
+
+
+def forwarded_response_headers(headers: httpx.Headers) -> Dict[str, str]:
+    forwarded = {name: value for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+    # Keep reverse proxies in front of us from buffering event streams
+    forwarded["X-Accel-Buffering"] = "no"
+    return forwarded
+
+
+class ProviderClients:
+    """
+    One keep-alive httpx client per model host (scheme, host and port), so
+    every model served from the same provider endpoint shares a connection
+    pool and a slow provider can't exhaust connections meant for another.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, Optional[int]], httpx.AsyncClient] = {}
+        # Per-host request counts, invocations and health probes kept apart
+        self.requests: Dict[str, int] = {}
+        self.probe_requests: Dict[str, int] = {}
+
+    @staticmethod
+    def host_key(url: httpx.URL) -> Tuple[str, str, Optional[int]]:
+        return url.scheme, url.host, url.port
+
+    def get(self, url: str, probe: bool = False) -> httpx.AsyncClient:
+        """
+        The client for `url`'s host; raises ModelURLError for a malformed URL.
+        `probe` counts the request as health-check traffic rather than an invocation.
+        """
+        try:
+            key = self.host_key(httpx.URL(url))
+        except (httpx.InvalidURL, TypeError) as e:
+            raise ModelURLError(f"Invalid URL: {e}")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=MODEL_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=MODEL_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=MODEL_HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(MODEL_HTTP_READ_TIMEOUT, connect=MODEL_HTTP_CONNECT_TIMEOUT),
+                # A redirect would go to a URL that never passed validate_model_url
+                follow_redirects=False,
+            )
+            self._clients[key] = client
+        host = f"{key[0]}://{key[1]}" + (f":{key[2]}" if key[2] else "")
+        counts = self.probe_requests if probe else self.requests
+        counts[host] = counts.get(host, 0) + 1
+        return client
+
+    async def stop(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": len(self._clients),
+            "requests": dict(self.requests),
+            "probe_requests": dict(self.probe_requests),
+        }
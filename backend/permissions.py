@@ -0,0 +1,87 @@
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+# Permissions shown in the PermissionsManager matrix; their order fixes their bit
+PERMISSIONS: List[str] = [
+    'Activate Graphmarts', 'Browse Dashboards', 'Browse Models', 'Create Dashboards',
+    'Create Graphmarts', 'Data On Demand', 'Manage Graphmarts', 'Manage Models',
+    'Show Query Builder', 'View Datasets', 'View Graphmarts', 'View Provenance',
+    'Create Anzo Data Stores', 'Create Data Sources'
+]
+
+
+class PermissionIndex:
+    """
+    Compiled role -> permission bitset view of the role_permissions table.
+
+    `load_rows` returns the enabled `(role, permission)` cells and
+    `load_version` the matrix version counter, which every write bumps in the
+    same transaction. Each worker re-reads the version at most every
+    `check_interval` seconds and only recompiles when it moved, so a check is a
+    dictionary lookup and a bit test. The loaders are blocking and run through
+    `run_blocking` (the threadpool by default).
+    """
+
+    def __init__(
+        self,
+        load_rows: Callable[[], Iterable[Tuple[str, str]]],
+        load_version: Callable[[], int],
+        check_interval: float = 2.0,
+        run_blocking: Callable[..., Awaitable[Any]] = run_in_threadpool,
+    ):
+        self.load_rows = load_rows
+        self.load_version = load_version
+        self.check_interval = check_interval
+        self.run_blocking = run_blocking
+
+        self._bits: Dict[str, int] = {name: 1 << i for i, name in enumerate(PERMISSIONS)}
+        self._role_masks: Dict[str, int] = {}
+        self.version = -1
+        self._checked_at = 0.0
+
+        self.compiles = 0
+        self.version_checks = 0
+
+    def compile(self, rows: Iterable[Tuple[str, str]], version: int) -> None:
+        bits = {name: 1 << i for i, name in enumerate(PERMISSIONS)}
+        role_masks: Dict[str, int] = {}
+        for role_name, permission_name in rows:
+            # Permissions saved from an older matrix still get a bit of their own
+            bit = bits.setdefault(permission_name, 1 << len(bits))
+            role_masks[role_name] = role_masks.get(role_name, 0) | bit
+        self._bits, self._role_masks = bits, role_masks
+        self.version = version
+        self.compiles += 1
+
+    async def refresh(self) -> None:
+        """Recompiles if the stored version moved; checks at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        self.version_checks += 1
+        version = await self.run_blocking(self.load_version)
+        if version != self.version:
+            rows = await self.run_blocking(lambda: list(self.load_rows()))
+            self.compile(rows, version)
+
+    def invalidate(self) -> None:
+        """Forces a version check on the next refresh (called after this worker writes)."""
+        self._checked_at = 0.0
+
+    def allows(self, roles: Iterable[str], permission: str) -> bool:
+        bit = self._bits.get(permission)
+        if bit is None:
+            return False
+        return any(self._role_masks.get(role, 0) & bit for role in roles)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "roles": len(self._role_masks),
+            "permissions": len(self._bits),
+            "compiles": self.compiles,
+            "version_checks": self.version_checks,
+        }
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from bulk_import import LineTooLongError, iter_body_lines  # noqa: E402
+
+
+class ChunkedRequest:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def read_lines(chunks, max_length=16):
+    async def collect():
+        return [line async for line in iter_body_lines(ChunkedRequest(chunks), max_length=max_length)]
+    return asyncio.run(collect())
+
+
+def test_lines_split_across_chunks():
+    assert read_lines([b"\xef\xbb\xbfa,b\r", b"\nc", b",d\n\ne,", b"f"]) == ["a,b", "c,d", "", "e,f"]
+
+
+def test_multibyte_character_split_across_chunks():
+    assert read_lines([b"caf\xc3", b"\xa9\n"]) == ["café"]
+
+
+@pytest.mark.parametrize("chunks", [
+    [b"x" * 10, b"x" * 10],
+    [b"ok\n" + b"x" * 17],
+    [b"x" * 17 + b"\nok\n"],
+])
+def test_overlong_line_is_rejected(chunks):
+    with pytest.raises(LineTooLongError):
+        read_lines(chunks)
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'test_cursors.db')}")
+os.environ["DIRECTORY_MIRROR_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+ADMIN = {"preferred_username": "admin", "realm_access": {"roles": ["admin"]}}
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[main.get_current_user] = lambda: ADMIN
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("state", [
+    {"first": "a"},
+    {"first": None},
+    {"first": -1},
+    {"max": "ten"},
+    {"max": 0},
+    {"sort": 5},
+    {"enabled": "yes"},
+])
+def test_tampered_user_cursor_is_rejected(client, state):
+    response = client.get("/admin/users", params={"cursor": main.encode_cursor(state)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_undecodable_user_cursor_is_rejected(client):
+    response = client.get("/admin/users", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("state", [
+    {"after": "a"},
+    {"after": -1},
+    {"limit": "five"},
+    {"limit": 0},
+    {"provider": ["openai"]},
+])
+def test_tampered_model_cursor_is_rejected(client, state):
+    response = client.get("/api/models", params={"cursor": main.encode_cursor(state)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,148 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+def token_digest(token: str) -> bytes:
+    # Never keep raw bearer tokens around as dict keys
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class VerifiedClaimsCache:
+    """
+    Bounded LRU of tokens whose signature and audience have already been checked.
+
+    Each entry keeps the decoded claims until the token's `exp`, along with the
+    `kid` it was signed with so entries can be dropped when that key is retired.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        claims, expires_at, _kid = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: Dict[str, Any], kid: Optional[str]) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_size <= 0:
+            return
+
+        digest = token_digest(token)
+        self._entries[digest] = (claims, expires_at, kid)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_kids(self, kids: Iterable[str]) -> None:
+        """Drops every entry signed by one of `kids` (called when keys rotate out)."""
+        kids = set(kids)
+        stale = [digest for digest, (_, _, kid) in self._entries.items() if kid in kids]
+        for digest in stale:
+            del self._entries[digest]
+        self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class IntrospectionCache:
+    """
+    Bounded LRU of token introspection responses.
+
+    Active tokens are kept until their `exp` (capped at `max_ttl` so a revoked
+    token is noticed reasonably soon); inactive tokens are negatively cached for
+    `negative_ttl` seconds so a replayed dead token doesn't reach Keycloak.
+    """
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 60.0, negative_ttl: float = 300.0):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached introspection response, or None on a miss."""
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        if entry[0].get("active"):
+            self.hits += 1
+        else:
+            self.negative_hits += 1
+        return entry[0]
+
+    def put(self, token: str, token_data: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+
+        now = time.time()
+        if token_data.get("active"):
+            expires_at = min(token_data.get("exp", now), now + self.max_ttl)
+        else:
+            expires_at = now + self.negative_ttl
+        if expires_at <= now:
+            return
+
+        digest = token_digest(token)
+        self._entries[digest] = (token_data, expires_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+
+class UserProvisioner:
+    """
+    Write-behind creation of local user rows.
+
+    `observe()` is called on every authenticated request. Usernames already
+    known to this worker are a set lookup; first-seen users are queued and
+    written by a background task in batches of up to `batch_size`, at least
+    every `flush_interval` seconds. `write_batch` must be idempotent (an
+    INSERT ... ON CONFLICT DO NOTHING), since every worker learns its own set
+    of known users. A failed batch is re-queued for the next flush.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        max_known: int = 100000,
+    ):
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_known = max_known
+
+        self._known: Set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.queued = 0
+        self.written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def observe(self, username: Optional[str], email: Optional[str]) -> None:
+        if not username or username in self._known:
+            return
+        if len(self._known) >= self.max_known:
+            # Forgetting only costs a redundant (idempotent) insert later
+            self._known.clear()
+        self._known.add(username)
+        self._pending[username] = {"username": username, "email": email}
+        self.queued += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Writes everything queued so far; returns how many users were written."""
+        written = 0
+        while self._pending:
+            usernames = list(self._pending)[:self.batch_size]
+            batch = [self._pending.pop(username) for username in usernames]
+            try:
+                await self.write_batch(batch)
+            except Exception:
+                for row in batch:
+                    self._pending.setdefault(row["username"], row)
+                raise
+            written += len(batch)
+        self.written += written
+        return written
+
+    # --- Lifecycle ---
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                await self.flush()
+                self.flushes += 1
+            except Exception as e:
+                self.flush_errors += 1
+                print(f"Warning: Could not write {len(self._pending)} queued user(s): {e}")
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Warning: Dropping {len(self._pending)} queued user(s) on shutdown: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "known": len(self._known),
+            "pending": len(self._pending),
+            "queued": self.queued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
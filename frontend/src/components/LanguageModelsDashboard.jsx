@@ -94,7 +94,7 @@ const LanguageModelsDashboard = ({ setCurrentPage, onViewModel }) => {
             <ModelCard
               name={model.model_name}
               version=""
-              isPrivate={model.is_public === 'false'}
+              isPrivate={!model.is_public}
               buttonColor="#3b82f6"
             />
           </div>